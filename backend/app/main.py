@@ -6,6 +6,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from app.routers import ai, tracks, itunes
+from app.services.scheduler import analysis_scheduler
 
 # Create FastAPI app
 app = FastAPI(
@@ -31,7 +32,11 @@ app.include_router(itunes.router, prefix="/api")
 # Health check endpoint
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy", "message": "MixOS API is running"}
+    return {
+        "status": "healthy",
+        "message": "MixOS API is running",
+        "analysis": analysis_scheduler.stats()
+    }
 
 @app.get("/")
 async def root():
@@ -1,6 +1,8 @@
 from pydantic import BaseModel
 from typing import List, Optional
 
+from app.models.schemas import Track
+
 class AITrackSuggestion(BaseModel):
     title: str
     artist: str
@@ -9,6 +11,8 @@ class AITrackSuggestion(BaseModel):
     energy: Optional[int] = None  # 1-10
     position: Optional[str] = None  # "opener", "build", "peak", "transition", "closer"
     reasoning: Optional[str] = None
+    local_match: Optional[Track] = None  # owned library track, if any
+    local_match_score: Optional[float] = None
 
 class AIPlaylistOption(BaseModel):
     name: str
@@ -30,3 +30,20 @@ class Track(CamelModel):
 class SearchResult(BaseModel):
     tracks: List[Track]
     total: int
+
+
+class BatchAnalyzeRequest(CamelModel):
+    tracks: List[Track]
+
+
+class BatchAnalyzeResult(CamelModel):
+    index: int  # position in the request
+    track: Track  # with measured bpm/key/energy when analysis succeeded
+    suggested_bpm: Optional[float] = None
+    suggested_key: Optional[str] = None
+    bpm_delta: Optional[float] = None  # measured - suggested
+    bpm_matches: Optional[bool] = None  # within tolerance, allowing half/double time
+    key_matches: Optional[bool] = None
+    key_compatible: Optional[bool] = None  # harmonically mixable on the Camelot wheel
+    cached: bool = False
+    error: Optional[str] = None
@@ -0,0 +1,21 @@
+from fastapi import HTTPException, Request
+
+from app.services.scheduler import SchedulerSaturated
+
+
+def get_client_id(request: Request) -> str:
+    """Identify the caller for per-client fairness in the analysis scheduler.
+
+    Keyed on the peer address only: a caller-chosen header could be rotated
+    per request to dodge the per-client queue cap and round-robin order.
+    """
+    return request.client.host if request.client else 'anonymous'
+
+
+def saturated(e: SchedulerSaturated) -> HTTPException:
+    """Translate a refused analysis job into a 429 with Retry-After."""
+    return HTTPException(
+        status_code=429,
+        detail=str(e),
+        headers={'Retry-After': str(e.retry_after)},
+    )
@@ -1,9 +1,26 @@
 from fastapi import APIRouter, HTTPException
 from app.models.ai_schemas import AIGenerateRequest, AIGenerateResponse, AIRefineRequest
 from app.services.ai_service import ai_service
+from app.services.audio_service import audio_service
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 
+
+def _strip_local_matches(playlist: dict) -> dict:
+    """Drop library annotations so they aren't fed back into the prompt."""
+    if 'playlists' not in playlist:
+        return playlist
+    stripped = dict(playlist)
+    stripped['playlists'] = [
+        {**p, 'tracks': [
+            {k: v for k, v in t.items() if k not in ('local_match', 'local_match_score')}
+            for t in p.get('tracks', [])
+        ]}
+        for p in playlist.get('playlists', [])
+    ]
+    return stripped
+
+
 @router.post("/generate-setlist", response_model=AIGenerateResponse)
 async def generate_setlist(request: AIGenerateRequest):
     """
@@ -20,7 +37,8 @@ async def generate_setlist(request: AIGenerateRequest):
             num_playlists=request.num_playlists or 2,
             target_duration=request.target_duration
         )
-        
+        audio_service.annotate_local_matches(result)
+
         return AIGenerateResponse(**result)
         
     except ValueError as e:
@@ -34,8 +52,9 @@ async def refine_setlist(request: AIRefineRequest):
     try:
         result = ai_service.refine_setlist(
             refinement=request.refinement,
-            current_playlist=request.current_playlist
+            current_playlist=_strip_local_matches(request.current_playlist)
         )
+        audio_service.annotate_local_matches(result)
         return AIGenerateResponse(**result)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,9 +1,23 @@
-from fastapi import APIRouter, HTTPException, Query
-from app.models.schemas import Track, SearchResult
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from app.models.schemas import Track, SearchResult, BatchAnalyzeRequest, BatchAnalyzeResult
+from app.routers.admission import get_client_id, saturated
 from app.services.itunes_service import itunes_service
+from app.services.preview_cache import preview_cache
+from app.services.scheduler import analysis_scheduler, Priority, SchedulerSaturated
 
 router = APIRouter(prefix="/itunes", tags=["itunes"])
 
+MAX_BATCH_SIZE = 100
+
+PREVIEW_MIME_TYPES = {
+    '.m4a': 'audio/mp4',
+    '.aac': 'audio/aac',
+    '.mp3': 'audio/mpeg',
+    '.wav': 'audio/wav',
+}
+
 
 @router.get("/search", response_model=SearchResult)
 async def search_tracks(q: str = Query(..., description="Search query")):
@@ -16,10 +30,69 @@ async def search_tracks(q: str = Query(..., description="Search query")):
 
 
 @router.post("/analyze", response_model=Track)
-async def analyze_track(track: Track):
+async def analyze_track(
+    track: Track,
+    priority: Priority = Query(Priority.INTERACTIVE, description="Scheduling class for the analysis"),
+    client_id: str = Depends(get_client_id),
+):
     """Analyze a track's preview for BPM/key/energy."""
     try:
-        analyzed = itunes_service.analyze_track(track)
+        analyzed = await itunes_service.analyze_track(
+            track, priority=priority, client_id=client_id
+        )
         return analyzed
+    except SchedulerSaturated as e:
+        raise saturated(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+
+@router.post(
+    "/analyze/batch",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}, "model": BatchAnalyzeResult}},
+)
+async def analyze_batch(
+    request: BatchAnalyzeRequest,
+    priority: Priority = Query(Priority.BULK, description="Scheduling class for the analysis"),
+    client_id: str = Depends(get_client_id),
+):
+    """Analyze many tracks' previews, streaming one NDJSON result per track as it finishes.
+
+    Each result carries the measured track plus how its bpm/key compare to
+    the values sent in (e.g. an AI setlist's guesses). Results arrive in
+    completion order; use `index` to map them back to the request.
+    """
+    if len(request.tracks) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} tracks per batch")
+    try:
+        analysis_scheduler.check_admission(priority, client_id)
+    except SchedulerSaturated as e:
+        raise saturated(e)
+
+    async def results():
+        async for result in itunes_service.analyze_batch(
+            request.tracks, priority=priority, client_id=client_id
+        ):
+            yield result.model_dump_json(by_alias=True) + '\n'
+
+    return StreamingResponse(results(), media_type='application/x-ndjson')
+
+
+@router.get("/preview")
+async def proxy_preview(url: str = Query(..., description="iTunes preview URL")):
+    """Serve a preview clip from the local cache, downloading it on first use."""
+    if not preview_cache.is_allowed(url):
+        raise HTTPException(status_code=400, detail="Not an iTunes preview URL")
+    try:
+        path = await preview_cache.fetch(url)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Preview download failed: {str(e)}")
+
+    ext = os.path.splitext(path)[1].lower()
+    return FileResponse(
+        path,
+        media_type=PREVIEW_MIME_TYPES.get(ext, 'application/octet-stream'),
+        headers={'Cache-Control': 'public, max-age=86400'},
+    )
@@ -1,9 +1,15 @@
+import gzip
 import os
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Query
+from fastapi.responses import FileResponse, Response
+from starlette.concurrency import run_in_threadpool
 from typing import List
 from app.models.schemas import Track
-from app.services.audio_service import audio_service
+from app.routers.admission import get_client_id, saturated
+from app.services.audio_service import audio_service, DuplicatePolicy
+from app.services import columnar
+from app.services.scheduler import Priority, SchedulerSaturated
+from app.services.waveform_service import waveform_service, ZOOM_LEVELS, SAMPLE_RATE
 
 MIME_TYPES = {
     '.mp3': 'audio/mpeg',
@@ -18,8 +24,22 @@ MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 
 
 @router.post("/upload", response_model=Track)
-async def upload_track(file: UploadFile = File(...)):
-    """Upload an audio file for analysis. Returns extracted track metadata."""
+async def upload_track(
+    file: UploadFile = File(...),
+    client_id: str = Depends(get_client_id),
+    on_duplicate: DuplicatePolicy = Query(
+        DuplicatePolicy.REUSE,
+        description="What to do when the audio matches a library track",
+    ),
+):
+    """Upload an audio file for analysis. Returns extracted track metadata.
+
+    Full-track analysis always runs in the bulk class, so uploads can't take
+    the workers reserved for interactive preview analysis.
+
+    With on_duplicate=link, a file that matches an existing track is discarded
+    and the existing track is returned.
+    """
     ext = os.path.splitext(file.filename or '')[1].lower()
     if ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
@@ -36,16 +56,78 @@ async def upload_track(file: UploadFile = File(...)):
         )
 
     try:
-        track = await audio_service.analyze_file(file_data, file.filename or 'unknown')
+        track = await audio_service.analyze_file(
+            file_data, file.filename or 'unknown',
+            priority=Priority.BULK, client_id=client_id,
+            on_duplicate=on_duplicate,
+        )
         return track
+    except SchedulerSaturated as e:
+        raise saturated(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 
+def _quality(header: str, value: str) -> float:
+    """q-value an Accept-style header gives value; the most specific range wins."""
+    best_specificity, best_q = -1, 0.0
+    for part in header.split(','):
+        token, *params = [p.strip() for p in part.split(';')]
+        token = token.lower()
+        if token == value:
+            specificity = 2
+        elif token == value.split('/')[0] + '/*':
+            specificity = 1
+        elif token in ('*/*', '*'):
+            specificity = 0
+        else:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, raw = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(raw)
+                except ValueError:
+                    q = 0.0
+        if specificity > best_specificity:
+            best_specificity, best_q = specificity, q
+    return best_q
+
+
+def _wants_columnar(accept: str) -> bool:
+    # Only on explicit request; wildcards alone keep getting JSON
+    named = any(part.split(';')[0].strip().lower() == columnar.MEDIA_TYPE for part in accept.split(','))
+    q = _quality(accept, columnar.MEDIA_TYPE)
+    return named and q > 0 and q >= _quality(accept, 'application/json')
+
+
+def _encode_columnar(tracks: List[Track], gzipped: bool) -> bytes:
+    payload = columnar.encode_tracks(tracks)
+    # Level 3 is within a few percent of 6 on this data at half the CPU
+    return gzip.compress(payload, compresslevel=3) if gzipped else payload
+
+
 @router.get("/library", response_model=List[Track])
-async def list_tracks():
-    """List all uploaded tracks in the library."""
-    return audio_service.get_all_tracks()
+async def list_tracks(request: Request, response: Response):
+    """List all uploaded tracks in the library.
+
+    Send `Accept: application/vnd.mixos.tracks+columnar` for a compact
+    column-oriented binary encoding instead of JSON.
+    """
+    tracks = audio_service.get_all_tracks()
+    # The representation depends on Accept, so caches must key on it either way
+    if not _wants_columnar(request.headers.get('accept', '')):
+        response.headers['Vary'] = 'Accept'
+        return tracks
+
+    gzipped = _quality(request.headers.get('accept-encoding', ''), 'gzip') > 0
+    # Large libraries take long enough to encode that it belongs off the event loop
+    payload = await run_in_threadpool(_encode_columnar, tracks, gzipped)
+    headers = {'Vary': 'Accept, Accept-Encoding'}
+    if gzipped:
+        headers['Content-Encoding'] = 'gzip'
+    return Response(content=payload, media_type=columnar.MEDIA_TYPE, headers=headers)
 
 
 @router.get("/{track_id}/audio")
@@ -59,6 +141,37 @@ async def stream_track(track_id: str):
     return FileResponse(file_path, media_type=media_type)
 
 
+@router.get("/{track_id}/peaks")
+async def get_peaks(
+    track_id: str,
+    zoom: int = Query(0, ge=0, le=len(ZOOM_LEVELS) - 1, description="0 = coarsest"),
+    bits: int = Query(16, description="Sample width: 8 or 16"),
+):
+    """Serve waveform peaks as interleaved little-endian [min, max] pairs."""
+    if bits not in (8, 16):
+        raise HTTPException(status_code=400, detail="bits must be 8 or 16")
+
+    headers = {
+        # Peaks never change for a given track id
+        'Cache-Control': 'public, max-age=31536000, immutable',
+        'X-Samples-Per-Peak': str(ZOOM_LEVELS[zoom]),
+        'X-Sample-Rate': str(SAMPLE_RATE),
+        'X-Peak-Bits': str(bits),
+    }
+
+    if bits == 16:
+        path = waveform_service.get_peaks_path(track_id, zoom)
+        if not path:
+            raise HTTPException(status_code=404, detail="Waveform not found")
+        return FileResponse(path, media_type='application/octet-stream', headers=headers)
+
+    data = waveform_service.read_peaks(track_id, zoom, bits=8)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Waveform not found")
+    headers['ETag'] = f'"{track_id}-{zoom}-8"'
+    return Response(content=data, media_type='application/octet-stream', headers=headers)
+
+
 @router.delete("/{track_id}")
 async def delete_track(track_id: str):
     """Delete a track from the library."""
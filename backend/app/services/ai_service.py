@@ -1,17 +1,26 @@
 import os
-from anthropic import Anthropic
+import threading
 from typing import Optional
 import json
 
 class AIService:
     def __init__(self):
-        api_key = os.getenv('ANTHROPIC_API_KEY')
-        if not api_key:
+        self._api_key = os.getenv('ANTHROPIC_API_KEY')
+        self._base_url = os.getenv('ANTHROPIC_BASE_URL')  # None -> SDK default
+        self._client = None
+        self._client_lock = threading.Lock()
+        if not self._api_key:
             print("⚠️  Anthropic API key not configured - AI features will be disabled")
-            self.client = None
-            return
 
-        self.client = Anthropic(api_key=api_key)
+    @property
+    def client(self):
+        """Anthropic client, created on first use so the SDK import stays off the startup path."""
+        if self._client is None and self._api_key:
+            with self._client_lock:
+                if self._client is None:
+                    from anthropic import Anthropic
+                    self._client = Anthropic(api_key=self._api_key, base_url=self._base_url)
+        return self._client
     
     def generate_setlist(
         self, 
@@ -0,0 +1,297 @@
+import os
+import subprocess
+from abc import ABC, abstractmethod
+import threading
+import wave
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+SAMPLE_RATE = 44100
+
+NOTE_TO_PITCH = {
+    'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3,
+    'E': 4, 'Fb': 4, 'F': 5, 'F#': 6, 'Gb': 6, 'G': 7,
+    'G#': 8, 'Ab': 8, 'A': 9, 'A#': 10, 'Bb': 10, 'B': 11, 'Cb': 11
+}
+CAMELOT_MAJOR = ['8B', '3B', '10B', '5B', '12B', '7B', '2B', '9B', '4B', '11B', '6B', '1B']
+CAMELOT_MINOR = ['5A', '12A', '7A', '2A', '9A', '4A', '11A', '6A', '1A', '8A', '3A', '10A']
+
+# Krumhansl-Kessler key profiles, tonic first
+MAJOR_PROFILE = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
+MINOR_PROFILE = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
+
+
+def pitch_to_camelot(key: int, mode: int) -> str:
+    """Convert pitch class and mode (1 = major) to Camelot notation."""
+    if key < 0 or key > 11:
+        return "Unknown"
+    return CAMELOT_MAJOR[key] if mode == 1 else CAMELOT_MINOR[key]
+
+
+def note_to_camelot(key_name: str, mode: int) -> str:
+    """Convert note name + mode to Camelot notation."""
+    pitch = NOTE_TO_PITCH.get(key_name)
+    if pitch is None:
+        return "Unknown"
+    return pitch_to_camelot(pitch, mode)
+
+
+def fold_bpm(bpm: float) -> int:
+    """Round and octave-correct a tempo into the DJ range."""
+    bpm = round(bpm)
+    if bpm <= 0:
+        return bpm
+    while bpm < 80:
+        bpm *= 2
+    while bpm > 200:
+        bpm //= 2
+    return bpm
+
+
+def rms_to_energy(rms: float) -> int:
+    """Map signal RMS onto the 1-10 energy scale."""
+    return min(10, max(1, round(rms * 30 + 1)))
+
+
+class AnalysisEngine(ABC):
+    """Decodes audio and extracts BPM, Camelot key and energy."""
+
+    name = 'base'
+
+    @abstractmethod
+    def load_audio(self, filepath: str) -> np.ndarray:
+        """Decode a file to a mono float32 signal at SAMPLE_RATE."""
+
+    @abstractmethod
+    def analyze(self, audio: np.ndarray) -> dict:
+        """Return {'bpm', 'key', 'energy'} for a decoded signal."""
+
+
+class EssentiaEngine(AnalysisEngine):
+    name = 'essentia'
+
+    def __init__(self):
+        # Heavy native import, deferred until an engine is actually needed
+        import essentia.standard as es
+        self._es = es
+
+    def load_audio(self, filepath: str) -> np.ndarray:
+        # MonoLoader handles mp3/wav/flac/m4a and resamples
+        return self._es.MonoLoader(filename=filepath, sampleRate=SAMPLE_RATE)()
+
+    def analyze(self, audio: np.ndarray) -> dict:
+        es = self._es
+
+        # --- BPM Detection (RhythmExtractor2013) ---
+        bpm, _, _, _, _ = es.RhythmExtractor2013(method="multifeature")(audio)
+
+        # --- Key Detection (KeyExtractor) ---
+        key_name, scale, _ = es.KeyExtractor()(audio)
+        mode = 1 if scale == 'major' else 0
+
+        # --- Energy (loudness mapped to 1-10) ---
+        rms = np.sqrt(es.Energy()(audio) / len(audio))
+
+        return {
+            'bpm': fold_bpm(bpm),
+            'key': note_to_camelot(key_name, mode),
+            'energy': rms_to_energy(rms),
+        }
+
+
+class NumpyEngine(AnalysisEngine):
+    """Lightweight analyzer needing only NumPy (and ffmpeg for compressed formats).
+
+    Tempo comes from harmonically summed autocorrelation of a spectral-flux
+    onset envelope, key from a chroma vector matched against
+    Krumhansl-Kessler profiles, and energy from framed RMS.
+    """
+
+    name = 'numpy'
+
+    ONSET_FFT = 1024
+    ONSET_HOP = 441  # 10ms -> 100 onset frames per second
+    CHROMA_FFT = 8192
+    CHROMA_HOP = 4096
+    CHUNK_FRAMES = 512
+    MIN_BPM = 60
+    MAX_BPM = 200
+    PRIOR_BPM = 135
+    PRIOR_WIDTH = 1.5  # octaves
+
+    def load_audio(self, filepath: str) -> np.ndarray:
+        try:
+            out = subprocess.run(
+                ['ffmpeg', '-nostdin', '-v', 'error', '-i', filepath,
+                 '-f', 'f32le', '-ac', '1', '-ar', str(SAMPLE_RATE), '-'],
+                capture_output=True, check=True,
+            )
+            return np.frombuffer(out.stdout, dtype='<f4').astype(np.float32)
+        except FileNotFoundError:
+            if filepath.lower().endswith('.wav'):
+                return self._load_wav(filepath)
+            raise RuntimeError("ffmpeg is required to decode this format without essentia")
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"ffmpeg failed: {e.stderr.decode(errors='replace').strip()}")
+
+    def analyze(self, audio: np.ndarray) -> dict:
+        if len(audio) < self.CHROMA_FFT:
+            raise ValueError("Audio too short to analyze")
+        pitch, mode = self._detect_key(audio)
+        return {
+            'bpm': fold_bpm(self._detect_bpm(audio)),
+            'key': pitch_to_camelot(pitch, mode),
+            'energy': rms_to_energy(self._rms(audio)),
+        }
+
+    def _frames(self, audio: np.ndarray, n_fft: int, hop: int) -> np.ndarray:
+        """Strided (copy-free) view of overlapping frames."""
+        return sliding_window_view(audio, n_fft)[::hop]
+
+    def _magnitudes(self, audio: np.ndarray, n_fft: int, hop: int):
+        """Yield windowed magnitude spectra in chunks to bound memory."""
+        frames = self._frames(audio, n_fft, hop)
+        window = np.hanning(n_fft).astype(np.float32)
+        for start in range(0, len(frames), self.CHUNK_FRAMES):
+            chunk = frames[start:start + self.CHUNK_FRAMES] * window
+            yield np.abs(np.fft.rfft(chunk, axis=1)).astype(np.float32)
+
+    def _detect_bpm(self, audio: np.ndarray) -> float:
+        # Spectral flux: sum of positive log-magnitude increases per frame
+        flux = []
+        prev = None
+        for mags in self._magnitudes(audio, self.ONSET_FFT, self.ONSET_HOP):
+            logmag = np.log1p(100 * mags)
+            if prev is not None:
+                logmag = np.vstack([prev, logmag])
+            diff = np.maximum(np.diff(logmag, axis=0), 0).sum(axis=1)
+            flux.append(diff)
+            prev = logmag[-1:]
+        onset = np.concatenate(flux)
+        # Onsets land between frames, so blur them over a few frames or
+        # the autocorrelation peak at one beat period gets smeared away
+        onset = np.convolve(onset, np.hanning(7), mode='same')
+        onset = onset - onset.mean()
+
+        # Autocorrelation via FFT
+        n = len(onset)
+        spectrum = np.fft.rfft(onset, 2 * n)
+        ac = np.fft.irfft(spectrum * np.conj(spectrum))[:n]
+
+        fps = SAMPLE_RATE / self.ONSET_HOP
+        # Peaks are sharp and the beat period is rarely a whole number of
+        # frames, so score a fractional lag grid against the local max of ac
+        peaks = np.maximum(np.maximum(ac[:-2], ac[1:-1]), ac[2:])
+        lags = np.arange(60 * fps / self.MAX_BPM, min(60 * fps / self.MIN_BPM, (n - 3) / 4), 0.1)
+
+        def at(lag_multiple: np.ndarray) -> np.ndarray:
+            return peaks[np.round(lag_multiple).astype(int) - 1]
+
+        # Harmonic summation: the true beat period also lines up with every
+        # second and fourth beat, which 2/3- and 3/2-time lags do not, and
+        # an offbeat hat only scores at half the period on its own
+        scores = at(lags) + at(2 * lags) / 2 + at(4 * lags) / 4
+        # Broad log-gaussian prior; it mostly breaks ties between a tempo
+        # and its half, where the harmonic scores are nearly equal
+        bpms = 60 * fps / lags
+        weights = np.exp(-0.5 * (np.log2(bpms / self.PRIOR_BPM) / self.PRIOR_WIDTH) ** 2)
+        lag = float(lags[int(np.argmax(scores * weights))])
+
+        # Refine on the fourth-beat peak, interpolated, for 4x the precision
+        center = int(round(4 * lag))
+        window = np.arange(center - 2, center + 3)
+        peak = int(window[np.argmax(ac[window])])
+        a, b, c = ac[peak - 1], ac[peak], ac[peak + 1]
+        denom = a - 2 * b + c
+        offset = 0.5 * (a - c) / denom if denom != 0 else 0.0
+        lag = (peak + offset) / 4
+
+        return 60 * fps / lag
+
+    def _detect_key(self, audio: np.ndarray) -> tuple:
+        freqs = np.fft.rfftfreq(self.CHROMA_FFT, 1 / SAMPLE_RATE)
+        usable = (freqs >= 55) & (freqs <= 5000)
+        pitch_classes = (np.round(12 * np.log2(freqs[usable] / 440)) + 69).astype(int) % 12
+        # (bins, 12) projection from spectrum onto pitch classes
+        projection = np.zeros((usable.sum(), 12), dtype=np.float32)
+        projection[np.arange(len(pitch_classes)), pitch_classes] = 1
+
+        chroma = np.zeros(12)
+        for mags in self._magnitudes(audio, self.CHROMA_FFT, self.CHROMA_HOP):
+            frame_chroma = np.log1p(mags[:, usable]) @ projection
+            norms = frame_chroma.max(axis=1, keepdims=True)
+            chroma += (frame_chroma / np.maximum(norms, 1e-9)).sum(axis=0)
+
+        # Correlate against the profile of every tonic in both modes
+        scores = [
+            [np.corrcoef(chroma, np.roll(profile, k))[0, 1] for k in range(12)]
+            for profile in (MINOR_PROFILE, MAJOR_PROFILE)
+        ]
+        mode, pitch = np.unravel_index(np.nanargmax(scores), (2, 12))
+        return int(pitch), int(mode)
+
+    def _rms(self, audio: np.ndarray) -> float:
+        frames = self._frames(audio, 2048, 2048)
+        frame_power = np.einsum('ij,ij->i', frames, frames) / frames.shape[1]
+        return float(np.sqrt(frame_power.mean()))
+
+    def _load_wav(self, filepath: str) -> np.ndarray:
+        with wave.open(filepath, 'rb') as wf:
+            channels = wf.getnchannels()
+            width = wf.getsampwidth()
+            rate = wf.getframerate()
+            raw = wf.readframes(wf.getnframes())
+
+        if width == 1:
+            data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+        elif width == 2:
+            data = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768
+        elif width == 4:
+            data = np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2147483648
+        else:
+            raise RuntimeError(f"Unsupported WAV sample width: {width * 8} bit")
+
+        data = data.reshape(-1, channels).mean(axis=1)
+        if rate != SAMPLE_RATE:
+            positions = np.arange(0, len(data), rate / SAMPLE_RATE)
+            data = np.interp(positions, np.arange(len(data)), data).astype(np.float32)
+        return data
+
+
+ENGINES = {
+    'essentia': EssentiaEngine,
+    'numpy': NumpyEngine,
+}
+
+_engine: Optional[AnalysisEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> AnalysisEngine:
+    """Return the configured engine, loading it on first use.
+
+    ANALYSIS_ENGINE selects 'essentia', 'numpy' or 'auto' (the default), which
+    prefers essentia and falls back to numpy when it isn't installed.
+    """
+    global _engine
+    if _engine is not None:
+        return _engine
+
+    with _engine_lock:
+        if _engine is None:
+            choice = os.getenv('ANALYSIS_ENGINE', 'auto').lower()
+            if choice == 'auto':
+                try:
+                    _engine = EssentiaEngine()
+                except ImportError:
+                    print("essentia not installed - using NumPy analysis engine")
+                    _engine = NumpyEngine()
+            elif choice in ENGINES:
+                _engine = ENGINES[choice]()
+            else:
+                raise ValueError(f"Unknown ANALYSIS_ENGINE '{choice}'. Use: auto, {', '.join(ENGINES)}")
+            print(f"Analysis engine: {_engine.name}")
+    return _engine
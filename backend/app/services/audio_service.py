@@ -1,27 +1,54 @@
 import os
 import uuid
-from typing import Dict, List, Optional
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
 
-import numpy as np
-import essentia.standard as es
 import mutagen
 from mutagen.mp3 import MP3
 from mutagen.flac import FLAC
 
 from app.models.schemas import Track
+from app.services.analysis_engine import get_engine
+from app.services.fingerprint import FingerprintIndex, compute_fingerprint
+from app.services.library_index import LibraryIndex, strip_noise
+from app.services.scheduler import analysis_scheduler, Priority
+from app.services.waveform_service import waveform_service
 
 
 UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'uploads')
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
+class DuplicatePolicy(str, Enum):
+    ANALYZE = 'analyze'  # always run the full analysis
+    REUSE = 'reuse'      # copy bpm/key/energy from the matching track
+    LINK = 'link'        # drop the new file and return the existing track
+
+
 class AudioService:
     def __init__(self):
         self._tracks: Dict[str, Track] = {}
         self._file_paths: Dict[str, str] = {}  # track_id -> file path
+        self._index = LibraryIndex()
+        self._fingerprints = FingerprintIndex()
+
+    async def analyze_file(
+        self,
+        file_data: bytes,
+        filename: str,
+        priority: Priority = Priority.BULK,
+        client_id: str = 'anonymous',
+        on_duplicate: DuplicatePolicy = DuplicatePolicy.REUSE,
+    ) -> Track:
+        """Save file, extract metadata + audio features, return Track.
+
+        Files that are acoustically the same as a library track (another
+        encoding, a re-tagged copy) are handled according to on_duplicate.
+        Raises SchedulerSaturated if the analysis queue can't take the job.
+        """
+        # Refuse before touching the disk if we'd be turned away anyway
+        analysis_scheduler.check_admission(priority, client_id)
 
-    async def analyze_file(self, file_data: bytes, filename: str) -> Track:
-        """Save file, extract metadata + audio features, return Track."""
         track_id = str(uuid.uuid4())
         suffix = os.path.splitext(filename)[1]
         stored_path = os.path.join(UPLOAD_DIR, f"{track_id}{suffix}")
@@ -33,9 +60,23 @@ class AudioService:
             metadata = self._extract_metadata(stored_path, filename)
 
             print(f"\nAnalyzing: '{metadata['title']}' by '{metadata['artist']}'")
-            audio_features = self._analyze_audio(stored_path)
+            audio_features = await analysis_scheduler.run(
+                self._analyze_audio, stored_path, on_duplicate,
+                priority=priority, client_id=client_id,
+            )
             print(f"Result: BPM={audio_features.get('bpm')}, Key={audio_features.get('key')}, Energy={audio_features.get('energy')}")
 
+            duplicate = self._tracks.get(audio_features.get('duplicate_of'))
+            if duplicate and on_duplicate == DuplicatePolicy.LINK:
+                print(f"Linked to existing track {duplicate.id}")
+                if duplicate.bpm is None:
+                    # Its own analysis failed; this copy's result fills the gap
+                    duplicate.bpm = audio_features.get('bpm')
+                    duplicate.key = audio_features.get('key')
+                    duplicate.energy = audio_features.get('energy')
+                os.unlink(stored_path)
+                return duplicate
+
             track = Track(
                 id=track_id,
                 title=metadata['title'],
@@ -49,12 +90,21 @@ class AudioService:
                 source='local'
             )
 
+            peaks = audio_features.get('peaks')
+            if peaks:
+                waveform_service.save_peaks(track_id, peaks)
+
             self._tracks[track_id] = track
             self._file_paths[track_id] = stored_path
+            self._index.add(track_id, track.title, track.artist)
+            fingerprint = audio_features.get('fingerprint')
+            if fingerprint is not None and len(fingerprint):
+                self._fingerprints.add(track_id, fingerprint)
             return track
         except Exception:
             if os.path.exists(stored_path):
                 os.unlink(stored_path)
+            waveform_service.delete_peaks(track_id)
             raise
 
     def _extract_metadata(self, filepath: str, original_filename: str) -> dict:
@@ -122,14 +172,11 @@ class AudioService:
 
     def _parse_filename(self, filename: str) -> tuple:
         """Parse 'Artist - Title [extra]' from filename. Returns (artist, title)."""
-        import re
         name = os.path.splitext(filename)[0]
 
         # Remove common suffixes: [Official Video], (Lyrics), (Official Visualizer), etc.
-        name = re.sub(r'\s*[\[\(][^\]\)]*(?:official|video|audio|lyrics|visualizer|remix|prod|ft\.?|feat\.?)[^\]\)]*[\]\)]', '', name, flags=re.IGNORECASE)
-        # Remove leftover empty brackets
-        name = re.sub(r'\s*[\[\(]\s*[\]\)]', '', name)
-        name = name.strip()
+        # Remix/edit markers stay, since they name a different track
+        name = strip_noise(name)
 
         # Try "Artist - Title" format
         if ' - ' in name:
@@ -146,69 +193,50 @@ class AudioService:
         # No separator found — use whole name as title
         return ('Unknown Artist', name.strip())
 
-    def _analyze_audio(self, filepath: str) -> dict:
-        """Extract BPM, key, and energy using essentia."""
-        try:
-            # Load audio with essentia (handles mp3/wav/flac, resamples to 44100)
-            audio = es.MonoLoader(filename=filepath, sampleRate=44100)()
-
-            # --- BPM Detection (RhythmExtractor2013) ---
-            rhythm_extractor = es.RhythmExtractor2013(method="multifeature")
-            bpm, beats, beats_confidence, _, beats_intervals = rhythm_extractor(audio)
-            bpm = round(bpm)
-
-            # Octave correction for DJ range
-            while bpm < 80:
-                bpm *= 2
-            while bpm > 200:
-                bpm //= 2
-
-            # --- Key Detection (KeyExtractor) ---
-            key_extractor = es.KeyExtractor()
-            key_name, scale, strength = key_extractor(audio)
-            # Convert to Camelot notation
-            mode = 1 if scale == 'major' else 0
-            key_camelot = self._note_to_camelot(key_name, mode)
-
-            # --- Energy (loudness mapped to 1-10) ---
-            energy_algo = es.Energy()
-            rms = np.sqrt(energy_algo(audio) / len(audio))
-            energy = min(10, max(1, round(rms * 30 + 1)))
+    def _analyze_audio(self, filepath: str, on_duplicate: DuplicatePolicy = DuplicatePolicy.ANALYZE) -> dict:
+        """Extract BPM, key, energy, fingerprint and waveform peaks with the analysis engine.
 
-            return {
-                'bpm': bpm,
-                'key': key_camelot,
-                'energy': energy
-            }
+        When the fingerprint matches a library track and on_duplicate allows
+        it, that track's features are reused instead of re-running analysis.
+        """
+        try:
+            engine = get_engine()
+            audio = engine.load_audio(filepath)
         except Exception as e:
-            print(f"Audio analysis failed: {e}")
+            print(f"Audio decoding failed: {e}")
             return {}
 
-    def _note_to_camelot(self, key_name: str, mode: int) -> str:
-        """Convert note name + mode to Camelot notation."""
-        # Map note names to pitch class numbers
-        note_to_pitch = {
-            'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3,
-            'E': 4, 'Fb': 4, 'F': 5, 'F#': 6, 'Gb': 6, 'G': 7,
-            'G#': 8, 'Ab': 8, 'A': 9, 'A#': 10, 'Bb': 10, 'B': 11, 'Cb': 11
+        # Taken straight from the decoded signal, so an analyzer failure
+        # (too short, silent input) doesn't cost the track its waveform
+        fingerprint = compute_fingerprint(audio)
+        features = {
+            'fingerprint': fingerprint,
+            'peaks': waveform_service.compute_peaks(audio),
         }
-        pitch = note_to_pitch.get(key_name)
-        if pitch is None:
-            return "Unknown"
-        return self._pitch_to_camelot(pitch, mode)
-
-    def _pitch_to_camelot(self, key: int, mode: int) -> str:
-        """Convert pitch class and mode to Camelot notation."""
-        camelot_major = ['8B', '3B', '10B', '5B', '12B', '7B', '2B', '9B', '4B', '11B', '6B', '1B']
-        camelot_minor = ['5A', '12A', '7A', '2A', '9A', '4A', '11A', '6A', '1A', '8A', '3A', '10A']
-
-        if key < 0 or key > 11:
-            return "Unknown"
 
-        if mode == 1:
-            return camelot_major[key]
-        else:
-            return camelot_minor[key]
+        match = None
+        if on_duplicate != DuplicatePolicy.ANALYZE and len(fingerprint):
+            match = self._fingerprints.lookup(fingerprint)
+        existing = self._tracks.get(match[0]) if match else None
+
+        # A duplicate whose own analysis failed has nothing worth inheriting
+        if existing and existing.bpm is not None:
+            print(f"Duplicate of {existing.id} (bit error rate {match[1]}), reusing analysis")
+            features.update({
+                'bpm': existing.bpm,
+                'key': existing.key,
+                'energy': existing.energy,
+                'duplicate_of': existing.id,
+            })
+            return features
+
+        if existing:
+            features['duplicate_of'] = existing.id
+        try:
+            features.update(engine.analyze(audio))
+        except Exception as e:
+            print(f"Audio analysis failed: {e}")
+        return features
 
     def get_all_tracks(self) -> List[Track]:
         return list(self._tracks.values())
@@ -219,12 +247,36 @@ class AudioService:
     def get_file_path(self, track_id: str) -> Optional[str]:
         return self._file_paths.get(track_id)
 
+    def find_local_match(self, title: str, artist: str) -> Optional[Tuple[Track, float]]:
+        """Best library track for a title/artist pair, with its match score."""
+        matches = self._index.search(title, artist)
+        if not matches:
+            return None
+        track_id, score = matches[0]
+        return self._tracks[track_id], score
+
+    def annotate_local_matches(self, result: dict) -> dict:
+        """Attach owned library tracks to AI suggestions in one pass over all playlists."""
+        cache: Dict[Tuple[str, str], Optional[Tuple[Track, float]]] = {}
+        for playlist in result.get('playlists', []):
+            for suggestion in playlist.get('tracks', []):
+                key = (suggestion.get('title') or '', suggestion.get('artist') or '')
+                if key not in cache:
+                    cache[key] = self.find_local_match(*key) if self._tracks else None
+                match = cache[key]
+                suggestion['local_match'] = match[0] if match else None
+                suggestion['local_match_score'] = match[1] if match else None
+        return result
+
     def delete_track(self, track_id: str) -> bool:
         if track_id in self._tracks:
             # Remove file from disk
             file_path = self._file_paths.pop(track_id, None)
             if file_path and os.path.exists(file_path):
                 os.unlink(file_path)
+            waveform_service.delete_peaks(track_id)
+            self._index.remove(track_id)
+            self._fingerprints.remove(track_id)
             del self._tracks[track_id]
             return True
         return False
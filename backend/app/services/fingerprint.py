@@ -0,0 +1,117 @@
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+FP_SAMPLE_RATE = 11025
+FRAME = 2048
+HOP = 256  # ~23ms; small enough that encoder delay doesn't break alignment
+MAX_SECONDS = 180
+BANDS = np.geomspace(300, 2000, 34)  # 33 bands -> 32 bits per frame
+
+# Subfingerprints produced by silence or clipping match everything
+IGNORED_VALUES = {0, 0xFFFFFFFF}
+
+
+def compute_fingerprint(audio: np.ndarray, sample_rate: int = 44100) -> np.ndarray:
+    """Compact Haitsma-Kalker style fingerprint: one uint32 per ~23ms frame.
+
+    Each bit is the sign of the change, across time, of the energy difference
+    between two adjacent frequency bands, which survives re-encoding, gain
+    changes and tag edits. Only the first MAX_SECONDS are used (~31 KB).
+    """
+    factor = sample_rate // FP_SAMPLE_RATE
+    audio = audio[:MAX_SECONDS * sample_rate]
+    audio = audio[:len(audio) // factor * factor].reshape(-1, factor).mean(axis=1)
+    if len(audio) < FRAME + 2 * HOP:
+        return np.zeros(0, dtype=np.uint32)
+
+    freqs = np.fft.rfftfreq(FRAME, 1 / FP_SAMPLE_RATE)
+    band_index = np.digitize(freqs, BANDS) - 1
+    in_range = (band_index >= 0) & (band_index < len(BANDS) - 1)
+    projection = np.zeros((len(freqs), len(BANDS) - 1), dtype=np.float32)
+    projection[np.flatnonzero(in_range), band_index[in_range]] = 1
+
+    frames = sliding_window_view(audio, FRAME)[::HOP]
+    window = np.hanning(FRAME).astype(np.float32)
+    energies = np.concatenate([
+        (np.abs(np.fft.rfft(frames[i:i + 512] * window, axis=1)) ** 2) @ projection
+        for i in range(0, len(frames), 512)
+    ])
+
+    band_diff = energies[:, :-1] - energies[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    weights = (1 << np.arange(32, dtype=np.uint64))
+    return (bits.astype(np.uint64) @ weights).astype(np.uint32)
+
+
+def bit_error_rate(a: np.ndarray, b: np.ndarray) -> float:
+    differing = np.unpackbits(np.bitwise_xor(a, b).view(np.uint8)).sum()
+    return float(differing) / (len(a) * 32)
+
+
+class FingerprintIndex:
+    """Near-duplicate lookup over fingerprints.
+
+    Every other subfingerprint goes into an inverted index. A query votes for
+    (track, time offset) pairs through exact subfingerprint hits, then the
+    best alignments are verified by bit error rate over the overlap.
+    """
+
+    INDEX_STRIDE = 2
+    MAX_BER = 0.35
+    MIN_OVERLAP = 200  # frames, ~4.6s
+    CANDIDATES = 3
+
+    def __init__(self):
+        self._postings: Dict[int, List[Tuple[str, int]]] = defaultdict(list)
+        self._fingerprints: Dict[str, np.ndarray] = {}
+        # Lookups run on analysis worker threads
+        self._lock = threading.Lock()
+
+    def add(self, track_id: str, fingerprint: np.ndarray) -> None:
+        with self._lock:
+            self._fingerprints[track_id] = fingerprint
+            for pos in range(0, len(fingerprint), self.INDEX_STRIDE):
+                value = int(fingerprint[pos])
+                if value not in IGNORED_VALUES:
+                    self._postings[value].append((track_id, pos))
+
+    def remove(self, track_id: str) -> None:
+        with self._lock:
+            fingerprint = self._fingerprints.pop(track_id, None)
+            if fingerprint is None:
+                return
+            for value in set(int(v) for v in fingerprint[::self.INDEX_STRIDE]):
+                postings = self._postings.get(value)
+                if postings:
+                    postings[:] = [p for p in postings if p[0] != track_id]
+                    if not postings:
+                        del self._postings[value]
+
+    def lookup(self, fingerprint: np.ndarray) -> Optional[Tuple[str, float]]:
+        """Return (track_id, bit error rate) of the closest duplicate, if any."""
+        with self._lock:
+            votes: Counter = Counter()
+            for pos, value in enumerate(fingerprint.tolist()):
+                if value in IGNORED_VALUES:
+                    continue
+                for track_id, db_pos in self._postings.get(value, ()):
+                    votes[(track_id, db_pos - pos)] += 1
+
+            best = None
+            for (track_id, offset), _ in votes.most_common(self.CANDIDATES):
+                ber = self._aligned_ber(fingerprint, self._fingerprints[track_id], offset)
+                if ber is not None and ber <= self.MAX_BER and (best is None or ber < best[1]):
+                    best = (track_id, round(ber, 3))
+            return best
+
+    def _aligned_ber(self, query: np.ndarray, stored: np.ndarray, offset: int) -> Optional[float]:
+        q_start, s_start = max(0, -offset), max(0, offset)
+        length = min(len(query) - q_start, len(stored) - s_start)
+        if length < self.MIN_OVERLAP:
+            return None
+        return bit_error_rate(query[q_start:q_start + length], stored[s_start:s_start + length])
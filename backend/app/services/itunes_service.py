@@ -1,18 +1,29 @@
-import requests
-import tempfile
+import asyncio
 import os
-from typing import List, Optional
+from collections import OrderedDict
+from contextlib import AsyncExitStack
+from typing import AsyncIterator, Dict, List, Optional
 
-import numpy as np
-import essentia.standard as es
+import requests
 
-from app.models.schemas import Track
+from app.models.schemas import Track, BatchAnalyzeResult
+from app.services.analysis_engine import get_engine
+from app.services.preview_cache import preview_cache
+from app.services.scheduler import analysis_scheduler, Priority, SchedulerSaturated
 
 
-ITUNES_SEARCH_URL = "https://itunes.apple.com/search"
+ITUNES_SEARCH_URL = os.getenv('ITUNES_SEARCH_URL', "https://itunes.apple.com/search")
+MAX_CACHED_RESULTS = 5000
+BATCH_DOWNLOADS = 8  # concurrent preview downloads per batch
+BPM_TOLERANCE = 2
 
 
 class ITunesService:
+    def __init__(self):
+        # preview_url -> features, most recently used last
+        self._results: "OrderedDict[str, dict]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
     def search_tracks(self, query: str, limit: int = 10) -> List[Track]:
         """Search iTunes for tracks. Returns tracks with preview URLs."""
         try:
@@ -36,12 +47,35 @@ class ITunesService:
             print(f"iTunes search failed: {e}")
             return []
 
-    def analyze_track(self, track: Track) -> Track:
-        """Download preview and analyze with essentia for BPM/key/energy."""
+    async def analyze_track(
+        self,
+        track: Track,
+        priority: Priority = Priority.INTERACTIVE,
+        client_id: str = 'anonymous',
+    ) -> Track:
+        """Download preview and analyze it for BPM/key/energy.
+
+        Raises SchedulerSaturated if the analysis queue can't take the job.
+        """
         if not track.preview_url:
             return track
 
-        features = self._analyze_preview(track.preview_url)
+        features = self._known(track.preview_url)
+        if features is not None:
+            track.bpm = features.get('bpm')
+            track.key = features.get('key')
+            track.energy = features.get('energy')
+            return track
+
+        async with AsyncExitStack() as stack:
+            try:
+                # Pinned so the clip can't be evicted while the job is queued
+                preview_path = await stack.enter_async_context(preview_cache.pinned(track.preview_url))
+            except Exception as e:
+                print(f"Preview download failed: {e}")
+                return track
+
+            features = await self._analyze_cached(track.preview_url, preview_path, priority, client_id)
         if features:
             track.bpm = features.get('bpm')
             track.key = features.get('key')
@@ -49,69 +83,127 @@ class ITunesService:
 
         return track
 
-    def _analyze_preview(self, preview_url: str) -> Optional[dict]:
-        """Download preview clip and analyze with essentia."""
+    async def analyze_batch(
+        self,
+        tracks: List[Track],
+        priority: Priority = Priority.BULK,
+        client_id: str = 'anonymous',
+    ) -> AsyncIterator[BatchAnalyzeResult]:
+        """Analyze many previews, yielding each result as soon as it's ready.
+
+        Downloads run ahead concurrently while analysis is fed to the
+        scheduler a few at a time, so a large batch never fills the queue.
+        Each result compares the measured bpm/key with the values the track
+        came in with (e.g. an AI's guesses).
+        """
+        downloads = asyncio.Semaphore(BATCH_DOWNLOADS)
+        # No more workers than bulk work may hold, even for an interactive
+        # batch, so other users' single-track analyses always find a slot
+        analysis_slots = asyncio.Semaphore(
+            max(1, min(analysis_scheduler.bulk_workers, analysis_scheduler.max_workers - 1))
+        )
+
+        async def process(index: int, track: Track) -> BatchAnalyzeResult:
+            suggested_bpm, suggested_key = track.bpm, track.key
+            url = track.preview_url
+            if not url:
+                return BatchAnalyzeResult(index=index, track=track, error="No preview available")
+
+            features = self._known(url)
+            cached = features is not None
+            if not cached:
+                async with AsyncExitStack() as stack:
+                    try:
+                        async with downloads:
+                            preview_path = await stack.enter_async_context(preview_cache.pinned(url))
+                    except Exception as e:
+                        return BatchAnalyzeResult(index=index, track=track, error=f"Preview download failed: {e}")
+                    try:
+                        async with analysis_slots:
+                            features = await self._analyze_cached(url, preview_path, priority, client_id)
+                    except SchedulerSaturated as e:
+                        return BatchAnalyzeResult(index=index, track=track, error=str(e))
+                    except Exception as e:
+                        return BatchAnalyzeResult(index=index, track=track, error=f"Analysis failed: {e}")
+
+            if not features:
+                return BatchAnalyzeResult(index=index, track=track, error="Analysis failed")
+
+            measured = track.model_copy(update={
+                'bpm': features.get('bpm'),
+                'key': features.get('key'),
+                'energy': features.get('energy'),
+            })
+            return _compare(index, measured, suggested_bpm, suggested_key, cached)
+
+        tasks = [asyncio.ensure_future(process(i, t)) for i, t in enumerate(tracks)]
         try:
-            resp = requests.get(preview_url, timeout=15)
-            resp.raise_for_status()
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Client went away mid-stream; stop pending work
+            for task in tasks:
+                task.cancel()
 
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.m4a') as tmp:
-                tmp.write(resp.content)
-                tmp_path = tmp.name
+    async def _analyze_cached(
+        self, preview_url: str, preview_path: str, priority: Priority, client_id: str
+    ) -> Optional[dict]:
+        """Analyze a preview once; later and concurrent callers share the result."""
+        features = self._known(preview_url)
+        if features is not None:
+            return features
 
+        pending = self._inflight.get(preview_url)
+        if pending is not None:
             try:
-                audio = es.MonoLoader(filename=tmp_path, sampleRate=44100)()
-
-                # BPM
-                rhythm = es.RhythmExtractor2013(method="multifeature")
-                bpm, _, _, _, _ = rhythm(audio)
-                bpm = round(bpm)
-                while bpm < 80:
-                    bpm *= 2
-                while bpm > 200:
-                    bpm //= 2
-
-                # Key
-                key_extractor = es.KeyExtractor()
-                key_name, scale, strength = key_extractor(audio)
-                mode = 1 if scale == 'major' else 0
-                key_camelot = self._note_to_camelot(key_name, mode)
-
-                # Energy
-                energy_val = es.Energy()(audio)
-                rms = np.sqrt(energy_val / len(audio))
-                energy = min(10, max(1, round(rms * 30 + 1)))
-
-                return {
-                    'bpm': bpm,
-                    'key': key_camelot,
-                    'energy': energy,
-                }
-            finally:
-                os.unlink(tmp_path)
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The caller doing the work was cancelled; take over
+                return await self._analyze_cached(preview_url, preview_path, priority, client_id)
+
+        pending = asyncio.get_running_loop().create_future()
+        self._inflight[preview_url] = pending
+        try:
+            features = await analysis_scheduler.run(
+                self._analyze_preview, preview_path,
+                priority=priority, client_id=client_id,
+            )
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            # Nobody else may be waiting; don't warn about an unretrieved exception
+            pending.exception()
+            raise
+        finally:
+            self._inflight.pop(preview_url, None)
+
+        if features:
+            self._results[preview_url] = features
+            while len(self._results) > MAX_CACHED_RESULTS:
+                self._results.popitem(last=False)
+        pending.set_result(features)
+        return features
+
+    def _known(self, preview_url: str) -> Optional[dict]:
+        """Previously measured features for a preview, if still cached."""
+        features = self._results.get(preview_url)
+        if features is not None:
+            self._results.move_to_end(preview_url)
+        return features
+
+    def _analyze_preview(self, preview_path: str) -> Optional[dict]:
+        """Analyze a cached preview clip with the analysis engine."""
+        try:
+            engine = get_engine()
+            return engine.analyze(engine.load_audio(preview_path))
         except Exception as e:
             print(f"Preview analysis failed: {e}")
             return None
 
-    def _note_to_camelot(self, key_name: str, mode: int) -> str:
-        """Convert note name + mode to Camelot notation."""
-        note_to_pitch = {
-            'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3,
-            'E': 4, 'Fb': 4, 'F': 5, 'F#': 6, 'Gb': 6, 'G': 7,
-            'G#': 8, 'Ab': 8, 'A': 9, 'A#': 10, 'Bb': 10, 'B': 11, 'Cb': 11
-        }
-        pitch = note_to_pitch.get(key_name)
-        if pitch is None:
-            return "Unknown"
-
-        camelot_major = ['8B', '3B', '10B', '5B', '12B', '7B', '2B', '9B', '4B', '11B', '6B', '1B']
-        camelot_minor = ['5A', '12A', '7A', '2A', '9A', '4A', '11A', '6A', '1A', '8A', '3A', '10A']
-
-        if mode == 1:
-            return camelot_major[pitch]
-        else:
-            return camelot_minor[pitch]
-
     def _convert_itunes_track(self, item: dict) -> Track:
         """Convert iTunes API response to Track model."""
         # Get higher-res artwork (300x300 instead of 100x100)
@@ -131,4 +223,47 @@ class ITunesService:
         )
 
 
+def _camelot(key: Optional[str]) -> Optional[tuple]:
+    """Split '8A' into (8, 'A'), or None if it isn't Camelot notation."""
+    if not key or len(key) < 2 or key[-1] not in 'AB' or not key[:-1].isdigit():
+        return None
+    number = int(key[:-1])
+    return (number, key[-1]) if 1 <= number <= 12 else None
+
+
+def _compare(
+    index: int, track: Track, suggested_bpm: Optional[float], suggested_key: Optional[str], cached: bool
+) -> BatchAnalyzeResult:
+    """Build a batch result noting where measurements differ from suggestions."""
+    bpm_delta = bpm_matches = key_matches = key_compatible = None
+
+    if track.bpm is not None and suggested_bpm is not None:
+        bpm_delta = round(track.bpm - suggested_bpm, 1)
+        # Half/double-time readings describe the same groove
+        bpm_matches = any(
+            abs(track.bpm * factor - suggested_bpm) <= BPM_TOLERANCE
+            for factor in (0.5, 1, 2)
+        )
+
+    measured, suggested = _camelot(track.key), _camelot(suggested_key)
+    if measured and suggested:
+        key_matches = measured == suggested
+        steps = abs(measured[0] - suggested[0]) % 12
+        steps = min(steps, 12 - steps)
+        # Same key, a neighbour on the wheel, or its relative major/minor
+        key_compatible = (steps <= 1 and measured[1] == suggested[1]) or (steps == 0)
+
+    return BatchAnalyzeResult(
+        index=index,
+        track=track,
+        suggested_bpm=suggested_bpm,
+        suggested_key=suggested_key,
+        bpm_delta=bpm_delta,
+        bpm_matches=bpm_matches,
+        key_matches=key_matches,
+        key_compatible=key_compatible,
+        cached=cached,
+    )
+
+
 itunes_service = ITunesService()
@@ -0,0 +1,119 @@
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Set, Tuple
+
+
+EMPTY_BRACKETS_RE = re.compile(r'\s*[\[\(]\s*[\]\)]')
+# Release-version tags DJs don't distinguish when looking for "the" track
+VERSION_RE = re.compile(
+    r'\s*[\[\(](?:original|extended|radio|club|album)\s+(?:mix|edit|version)[\]\)]',
+    flags=re.IGNORECASE,
+)
+FEATURING_RE = re.compile(r'\s+(?:feat\.?|ft\.?|featuring)\s+.*$', flags=re.IGNORECASE)
+BRACKETED_RE = re.compile(r'\s*[\[\(]([^\]\)]*)[\]\)]')
+# Bracketed text that only describes the upload, never which recording it is
+NOISE_RE = re.compile(r'official|video|audio|lyrics|visualizer|prod|ft\.?|feat\.?', flags=re.IGNORECASE)
+# Remixes, edits, dubs etc. are different tracks to a DJ and must not match the original
+MIX_RE = re.compile(r'\b(?:remix|mix|edit|dub|vip|bootleg|rework|flip|version)\b', flags=re.IGNORECASE)
+NON_WORD_RE = re.compile(r'[^\w\s]+')
+
+
+def strip_noise(name: str) -> str:
+    """Remove [Official Video], (Lyrics), (feat. X) etc., keeping remix/edit markers."""
+    def drop(match: re.Match) -> str:
+        inner = match.group(1)
+        return '' if NOISE_RE.search(inner) and not MIX_RE.search(inner) else match.group(0)
+    return EMPTY_BRACKETS_RE.sub('', BRACKETED_RE.sub(drop, name)).strip()
+
+
+def normalize(text: str) -> str:
+    """Lowercase, accent-free, punctuation-free form used for matching."""
+    text = VERSION_RE.sub('', text or '')
+    text = strip_noise(text)
+    text = FEATURING_RE.sub('', text)
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = text.lower().replace('&', ' and ')
+    text = NON_WORD_RE.sub(' ', text)
+    return ' '.join(text.split())
+
+
+class LibraryIndex:
+    """Token inverted index over track titles/artists with fuzzy scoring.
+
+    Candidates are tracks sharing at least one normalized token with the
+    query, ranked by summed inverse document frequency; the best few are then
+    scored with a character-level similarity on title and artist.
+    """
+
+    TITLE_WEIGHT = 0.65
+    ARTIST_WEIGHT = 0.35
+    # Same artist plus a similar title is usually a different song by them
+    MIN_TITLE_SIMILARITY = 0.9
+    MAX_CANDIDATES = 20
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._entries: Dict[str, Tuple[str, str, Set[str]]] = {}
+
+    def add(self, track_id: str, title: str, artist: str) -> None:
+        self.remove(track_id)
+        norm_title, norm_artist = normalize(title), normalize(artist)
+        tokens = set(norm_title.split()) | set(norm_artist.split())
+        self._entries[track_id] = (norm_title, norm_artist, tokens)
+        for token in tokens:
+            self._postings[token].add(track_id)
+
+    def remove(self, track_id: str) -> None:
+        entry = self._entries.pop(track_id, None)
+        if not entry:
+            return
+        for token in entry[2]:
+            ids = self._postings.get(token)
+            if ids:
+                ids.discard(track_id)
+                if not ids:
+                    del self._postings[token]
+
+    def search(self, title: str, artist: str, min_score: float = 0.8) -> List[Tuple[str, float]]:
+        """Return (track_id, score) pairs scoring at least min_score, best first."""
+        norm_title, norm_artist = normalize(title), normalize(artist)
+        tokens = set(norm_title.split()) | set(norm_artist.split())
+
+        weights: Dict[str, float] = defaultdict(float)
+        for token in tokens:
+            ids = self._postings.get(token)
+            if ids:
+                idf = 1.0 / len(ids)
+                for track_id in ids:
+                    weights[track_id] += idf
+        candidates = sorted(weights, key=weights.get, reverse=True)[:self.MAX_CANDIDATES]
+
+        results = []
+        for track_id in candidates:
+            entry_title, entry_artist, _ = self._entries[track_id]
+            title_score = self._similarity(norm_title, entry_title)
+            if title_score < self.MIN_TITLE_SIMILARITY:
+                continue
+            score = (
+                self.TITLE_WEIGHT * title_score
+                + self.ARTIST_WEIGHT * self._artist_similarity(norm_artist, entry_artist)
+            )
+            if score >= min_score:
+                results.append((track_id, round(score, 3)))
+        results.sort(key=lambda r: r[1], reverse=True)
+        return results
+
+    def _similarity(self, a: str, b: str) -> float:
+        if not a or not b:
+            return 0.0
+        return SequenceMatcher(None, a, b).ratio()
+
+    def _artist_similarity(self, a: str, b: str) -> float:
+        # "A and B" vs "A": full credit when one artist list contains the other
+        a_tokens, b_tokens = set(a.split()), set(b.split())
+        if a_tokens and b_tokens and (a_tokens <= b_tokens or b_tokens <= a_tokens):
+            return 1.0
+        return self._similarity(a, b)
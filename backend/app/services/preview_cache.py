@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from collections import Counter, OrderedDict, defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+
+CACHE_DIR = os.getenv(
+    'PREVIEW_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'cache', 'previews'),
+)
+
+# Preview clips are only ever fetched from Apple's CDNs; anything else would
+# turn the proxy into an open relay. Entries starting with '.' match any
+# subdomain, others must match exactly.
+DEFAULT_ALLOWED_HOSTS = ('.apple.com', '.mzstatic.com')
+MAX_REDIRECTS = 5
+MAX_PREVIEW_BYTES = 20 * 1024 * 1024  # generous for a 30s clip
+
+
+class PreviewCache:
+    """Size-bounded, LRU-evicted on-disk cache of preview clips.
+
+    Blobs are stored under the sha256 of their content, so identical clips
+    behind different URLs share one file. A small ref file per URL points at
+    the blob and is deleted along with it. Concurrent requests for the same
+    URL share a single download. Blobs in use via `pinned()` are never
+    evicted.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, allowed_hosts: tuple = DEFAULT_ALLOWED_HOSTS):
+        self.max_bytes = max_bytes
+        self.allowed_hosts = allowed_hosts
+        self._blob_dir = os.path.join(cache_dir, 'blobs')
+        self._ref_dir = os.path.join(cache_dir, 'refs')
+        os.makedirs(self._blob_dir, exist_ok=True)
+        os.makedirs(self._ref_dir, exist_ok=True)
+
+        # blob name -> size, least recently used first
+        self._lru: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        # blob name -> names of the ref files pointing at it
+        self._refs: Dict[str, Set[str]] = defaultdict(set)
+        self._pins: Counter = Counter()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._load_index()
+
+    def is_allowed(self, url: str) -> bool:
+        parsed = urlparse(url)
+        host = parsed.hostname or ''
+        return parsed.scheme in ('http', 'https') and any(
+            host == allowed.lstrip('.') or (allowed.startswith('.') and host.endswith(allowed))
+            for allowed in self.allowed_hosts
+        )
+
+    async def fetch(self, url: str) -> str:
+        """Return a local path for the clip at url, downloading it at most once."""
+        if not self.is_allowed(url):
+            raise ValueError(f"Preview host not allowed: {url}")
+
+        path = self._lookup(url)
+        if path:
+            return path
+
+        pending = self._inflight.get(url)
+        if pending is None:
+            pending = asyncio.ensure_future(self._download(url))
+            self._inflight[url] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(url, None))
+        # shield so one cancelled waiter doesn't abort the shared download
+        return await asyncio.shield(pending)
+
+    @asynccontextmanager
+    async def pinned(self, url: str) -> AsyncIterator[str]:
+        """Fetch the clip at url and keep it from being evicted until exit."""
+        while True:
+            path = await self.fetch(url)
+            blob = os.path.basename(path)
+            # Another download may have evicted it before we resumed
+            if blob in self._lru:
+                break
+        self._pins[blob] += 1
+        try:
+            yield path
+        finally:
+            self._pins[blob] -= 1
+            if not self._pins[blob]:
+                del self._pins[blob]
+                self._evict(keep='')
+
+    def _lookup(self, url: str) -> Optional[str]:
+        ref_path = self._ref_path(url)
+        try:
+            with open(ref_path) as f:
+                blob = f.read().strip()
+        except FileNotFoundError:
+            return None
+
+        if blob not in self._lru:
+            # Blob was evicted; drop the dangling ref
+            os.unlink(ref_path)
+            return None
+
+        self._lru.move_to_end(blob)
+        blob_path = os.path.join(self._blob_dir, blob)
+        # mtime records recency so LRU order survives restarts
+        os.utime(blob_path)
+        return blob_path
+
+    async def _download(self, url: str) -> str:
+        content = await asyncio.to_thread(self._get, url)
+
+        suffix = os.path.splitext(urlparse(url).path)[1].lower() or '.m4a'
+        blob = hashlib.sha256(content).hexdigest() + suffix
+        blob_path = os.path.join(self._blob_dir, blob)
+
+        if blob not in self._lru:
+            await asyncio.to_thread(self._write_atomic, blob_path, content)
+            # Another URL with the same content may have landed during the write
+            if blob not in self._lru:
+                self._lru[blob] = len(content)
+                self._total_bytes += len(content)
+        self._lru.move_to_end(blob)
+
+        ref_path = self._ref_path(url)
+        self._refs[blob].add(os.path.basename(ref_path))
+        self._write_atomic(ref_path, blob.encode())
+
+        self._evict(keep=blob)
+        return blob_path
+
+    def _get(self, url: str) -> bytes:
+        # Redirects are followed by hand so every hop is checked against the
+        # allowlist, and the body is streamed so one clip can't exhaust memory
+        for _ in range(MAX_REDIRECTS + 1):
+            with requests.get(url, timeout=15, stream=True, allow_redirects=False) as resp:
+                if resp.is_redirect:
+                    url = urljoin(url, resp.headers['Location'])
+                    if not self.is_allowed(url):
+                        raise ValueError(f"Preview redirected to a host that isn't allowed: {url}")
+                    continue
+                resp.raise_for_status()
+                if int(resp.headers.get('Content-Length') or 0) > MAX_PREVIEW_BYTES:
+                    raise ValueError("Preview too large")
+                chunks, size = [], 0
+                for chunk in resp.iter_content(64 * 1024):
+                    size += len(chunk)
+                    if size > MAX_PREVIEW_BYTES:
+                        raise ValueError("Preview too large")
+                    chunks.append(chunk)
+                return b''.join(chunks)
+        raise ValueError(f"Too many redirects fetching preview: {url}")
+
+    def _evict(self, keep: str) -> None:
+        for blob, size in list(self._lru.items()):
+            if self._total_bytes <= self.max_bytes or len(self._lru) <= 1:
+                break
+            if blob == keep or blob in self._pins:
+                continue
+            del self._lru[blob]
+            self._total_bytes -= size
+            stale = [os.path.join(self._ref_dir, ref) for ref in self._refs.pop(blob, ())]
+            for path in [os.path.join(self._blob_dir, blob)] + stale:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+    def _load_index(self) -> None:
+        """Rebuild LRU order from blob mtimes left by a previous run."""
+        entries = []
+        for name in os.listdir(self._blob_dir):
+            if name.startswith('.'):
+                continue
+            stat = os.stat(os.path.join(self._blob_dir, name))
+            entries.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._lru[name] = size
+            self._total_bytes += size
+
+        for ref in os.listdir(self._ref_dir):
+            path = os.path.join(self._ref_dir, ref)
+            if ref.startswith('.'):
+                continue
+            with open(path) as f:
+                blob = f.read().strip()
+            if blob in self._lru:
+                self._refs[blob].add(ref)
+            else:
+                os.unlink(path)
+        self._evict(keep='')
+
+    def _ref_path(self, url: str) -> str:
+        return os.path.join(self._ref_dir, hashlib.sha256(url.encode()).hexdigest())
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+preview_cache = PreviewCache(
+    CACHE_DIR,
+    max_bytes=int(os.getenv('PREVIEW_CACHE_MAX_MB', '512')) * 1024 * 1024,
+    allowed_hosts=DEFAULT_ALLOWED_HOSTS + tuple(
+        h.strip() for h in os.getenv('PREVIEW_ALLOWED_HOSTS', '').split(',') if h.strip()
+    ),
+)
@@ -0,0 +1,162 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Callable, Deque, Dict
+
+
+class Priority(str, Enum):
+    INTERACTIVE = 'interactive'
+    BULK = 'bulk'
+
+
+class SchedulerSaturated(Exception):
+    """Raised when a job can't be queued; the caller should retry later."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Analysis queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AnalysisScheduler:
+    """Runs blocking analysis jobs on a thread pool with admission control.
+
+    Interactive jobs are always dispatched before bulk jobs, and bulk jobs may
+    only occupy `bulk_workers` of the `max_workers` slots, so a large import
+    never takes the slots a single-click analysis needs. Within a priority
+    class, clients are served round-robin so one client can't starve others.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        bulk_workers: int = 2,
+        max_queued: int = 200,
+        max_queued_per_client: int = 50,
+    ):
+        self.max_workers = max_workers
+        self.bulk_workers = min(bulk_workers, max_workers)
+        self.max_queued = max_queued
+        self.max_queued_per_client = max_queued_per_client
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis')
+        # priority -> client_id -> waiting jobs, in round-robin order
+        self._queues: Dict[Priority, "OrderedDict[str, Deque[asyncio.Future]]"] = {
+            p: OrderedDict() for p in Priority
+        }
+        self._queued: Dict[Priority, int] = {p: 0 for p in Priority}
+        self._running: Dict[Priority, int] = {p: 0 for p in Priority}
+        self._avg_duration = 5.0  # seconds, smoothed
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        priority: Priority = Priority.INTERACTIVE,
+        client_id: str = 'anonymous',
+    ) -> Any:
+        """Wait for a slot, run fn(*args) in the worker pool and return its result."""
+        self.check_admission(priority, client_id)
+
+        loop = asyncio.get_running_loop()
+        slot = loop.create_future()
+        self._queues[priority].setdefault(client_id, deque()).append(slot)
+        self._queued[priority] += 1
+        self._dispatch()
+
+        try:
+            await slot
+        except asyncio.CancelledError:
+            if not slot.done() or slot.cancelled():
+                self._discard(priority, client_id, slot)
+            else:
+                # Slot was granted just as we were cancelled; give it back
+                self._release(priority)
+            raise
+
+        started = time.monotonic()
+        job = loop.run_in_executor(self._executor, fn, *args)
+        job.add_done_callback(lambda f: self._finish(priority, started, f))
+        # A worker thread can't be interrupted, so a cancelled caller leaves
+        # the job running; its slot is only freed once the job really ends
+        return await asyncio.shield(job)
+
+    def check_admission(self, priority: Priority, client_id: str) -> None:
+        """Raise SchedulerSaturated if a new job from this client would be refused."""
+        client_queue = self._queues[priority].get(client_id)
+        if (self._queued[priority] >= self.max_queued
+                or (client_queue and len(client_queue) >= self.max_queued_per_client)):
+            raise SchedulerSaturated(self._retry_after(priority))
+
+    def capacity(self, priority: Priority) -> int:
+        """Number of jobs of this priority that can run at once."""
+        return self.max_workers if priority == Priority.INTERACTIVE else self.bulk_workers
+
+    def stats(self) -> dict:
+        return {
+            p.value: {'queued': self._queued[p], 'running': self._running[p]}
+            for p in Priority
+        }
+
+    def _dispatch(self) -> None:
+        for priority in (Priority.INTERACTIVE, Priority.BULK):
+            while self._has_free_slot(priority) and self._queued[priority]:
+                slot = self._next_slot(priority)
+                if slot is None:
+                    break
+                self._running[priority] += 1
+                slot.set_result(None)
+
+    def _has_free_slot(self, priority: Priority) -> bool:
+        total = sum(self._running.values())
+        if total >= self.max_workers:
+            return False
+        if priority == Priority.BULK:
+            return self._running[Priority.BULK] < self.bulk_workers
+        return True
+
+    def _next_slot(self, priority: Priority):
+        clients = self._queues[priority]
+        while clients:
+            client_id, waiting = next(iter(clients.items()))
+            slot = waiting.popleft()
+            self._queued[priority] -= 1
+            if waiting:
+                clients.move_to_end(client_id)
+            else:
+                del clients[client_id]
+            if not slot.done():
+                return slot
+        return None
+
+    def _discard(self, priority: Priority, client_id: str, slot: asyncio.Future) -> None:
+        waiting = self._queues[priority].get(client_id)
+        if waiting and slot in waiting:
+            waiting.remove(slot)
+            self._queued[priority] -= 1
+            if not waiting:
+                del self._queues[priority][client_id]
+
+    def _finish(self, priority: Priority, started: float, job: asyncio.Future) -> None:
+        if not job.cancelled():
+            job.exception()  # the caller may be gone; don't warn about it
+        self._avg_duration = 0.8 * self._avg_duration + 0.2 * (time.monotonic() - started)
+        self._release(priority)
+
+    def _release(self, priority: Priority) -> None:
+        self._running[priority] -= 1
+        self._dispatch()
+
+    def _retry_after(self, priority: Priority) -> int:
+        backlog = self._queued[priority] + self._running[priority]
+        return max(1, math.ceil(backlog * self._avg_duration / self.capacity(priority)))
+
+
+analysis_scheduler = AnalysisScheduler(
+    max_workers=int(os.getenv('ANALYSIS_MAX_WORKERS', '4')),
+    bulk_workers=int(os.getenv('ANALYSIS_BULK_WORKERS', '2')),
+    max_queued=int(os.getenv('ANALYSIS_MAX_QUEUED', '200')),
+    max_queued_per_client=int(os.getenv('ANALYSIS_MAX_QUEUED_PER_CLIENT', '50')),
+)
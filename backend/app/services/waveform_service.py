@@ -0,0 +1,81 @@
+import os
+from typing import Dict, Optional
+
+import numpy as np
+
+
+PEAKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'uploads', 'peaks')
+os.makedirs(PEAKS_DIR, exist_ok=True)
+
+# Samples per peak for each zoom level, coarsest first. Each level is 4x finer
+# than the previous one, so every level can be derived from the finest one.
+ZOOM_LEVELS = [16384, 4096, 1024, 256]
+SAMPLE_RATE = 44100
+
+
+class WaveformService:
+    def compute_peaks(self, audio: np.ndarray) -> Dict[int, np.ndarray]:
+        """Build min/max peaks for every zoom level from a mono float signal.
+
+        Returns {zoom: int16 array of interleaved [min, max] pairs}.
+        """
+        finest = ZOOM_LEVELS[-1]
+        pad = (-len(audio)) % finest
+        if pad and len(audio):
+            # Repeat the last sample so padding can't drag the final bucket towards zero
+            audio = np.pad(audio, (0, pad), mode='edge')
+
+        frames = audio.reshape(-1, finest)
+        mins = frames.min(axis=1)
+        maxs = frames.max(axis=1)
+
+        peaks = {}
+        for zoom in range(len(ZOOM_LEVELS) - 1, -1, -1):
+            interleaved = np.empty(len(mins) * 2, dtype=np.int16)
+            interleaved[0::2] = np.clip(np.round(mins * 32767), -32768, 32767)
+            interleaved[1::2] = np.clip(np.round(maxs * 32767), -32768, 32767)
+            peaks[zoom] = interleaved
+
+            if zoom == 0:
+                break
+            # Fold 4 neighbouring peaks into one for the next coarser level
+            factor = ZOOM_LEVELS[zoom - 1] // ZOOM_LEVELS[zoom]
+            pad = (-len(mins)) % factor
+            if pad:
+                mins = np.pad(mins, (0, pad), mode='edge')
+                maxs = np.pad(maxs, (0, pad), mode='edge')
+            mins = mins.reshape(-1, factor).min(axis=1)
+            maxs = maxs.reshape(-1, factor).max(axis=1)
+
+        return peaks
+
+    def save_peaks(self, track_id: str, peaks: Dict[int, np.ndarray]) -> None:
+        """Write each zoom level as a raw little-endian int16 file."""
+        for zoom, data in peaks.items():
+            data.astype('<i2').tofile(self._peaks_path(track_id, zoom))
+
+    def get_peaks_path(self, track_id: str, zoom: int) -> Optional[str]:
+        path = self._peaks_path(track_id, zoom)
+        return path if os.path.exists(path) else None
+
+    def read_peaks(self, track_id: str, zoom: int, bits: int = 16) -> Optional[bytes]:
+        """Return the raw peak buffer, downsampled to int8 when bits == 8."""
+        path = self.get_peaks_path(track_id, zoom)
+        if not path:
+            return None
+        data = np.fromfile(path, dtype='<i2')
+        if bits == 8:
+            return (data >> 8).astype(np.int8).tobytes()
+        return data.tobytes()
+
+    def delete_peaks(self, track_id: str) -> None:
+        for zoom in range(len(ZOOM_LEVELS)):
+            path = self._peaks_path(track_id, zoom)
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _peaks_path(self, track_id: str, zoom: int) -> str:
+        return os.path.join(PEAKS_DIR, f"{track_id}.{zoom}.i16")
+
+
+waveform_service = WaveformService()
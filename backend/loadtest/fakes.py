@@ -0,0 +1,182 @@
+"""Local stand-ins for the iTunes Search API and the Anthropic Messages API.
+
+Both servers inject configurable latency and error rates so the harness can
+see how MixOS behaves when its upstreams are slow or flaky.
+"""
+import asyncio
+import io
+import json
+import random
+import uuid
+import wave
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+
+@dataclass
+class FakeConfig:
+    latency_ms: float = 50
+    jitter_ms: float = 25
+    error_rate: float = 0.0
+    catalogue_size: int = 200
+    preview_seconds: int = 30
+    stream_chunk_chars: int = 200
+
+    async def delay(self) -> None:
+        latency = max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        await asyncio.sleep(latency)
+
+    def should_fail(self) -> bool:
+        return random.random() < self.error_rate
+
+
+def catalogue_entry(i: int, base_url: str) -> dict:
+    """A deterministic fake iTunes song result."""
+    return {
+        'trackId': 100000 + i,
+        'trackName': f"Fake Track {i}",
+        'artistName': f"Fake Artist {i % 40}",
+        'collectionName': f"Fake Album {i % 25}",
+        'artworkUrl100': f"{base_url}/art/{i}/100x100bb.jpg",
+        'trackTimeMillis': 240000 + (i % 60) * 1000,
+        'previewUrl': f"{base_url}/previews/{i}.wav",
+    }
+
+
+@lru_cache(maxsize=64)
+def preview_wav(i: int, seconds: int) -> bytes:
+    """Click track with a chord, at a per-track tempo, as 16-bit mono WAV."""
+    sample_rate = 44100
+    bpm = 110 + (i % 30)
+    t = np.arange(seconds * sample_rate) / sample_rate
+    beat_phase = t % (60 / bpm)
+    chord = sum(np.sin(2 * np.pi * 220 * 2 ** (n / 12) * t) for n in (0, 3 + i % 2, 7)) * 0.1
+    clicks = np.sin(2 * np.pi * 60 * t) * np.exp(-beat_phase * 30) * 0.5
+    signal = np.clip(chord + clicks, -1, 1)
+
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes((signal * 32767).astype('<i2').tobytes())
+    return buf.getvalue()
+
+
+def create_itunes_app(config: FakeConfig, base_url: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/search")
+    async def search(term: str = '', limit: int = 10):
+        await config.delay()
+        if config.should_fail():
+            return JSONResponse({'errorMessage': 'Injected failure'}, status_code=503)
+        start = abs(hash(term)) % config.catalogue_size
+        results = [
+            catalogue_entry((start + k) % config.catalogue_size, base_url)
+            for k in range(min(limit, 50))
+        ]
+        return {'resultCount': len(results), 'results': results}
+
+    @app.get("/previews/{i}.wav")
+    async def preview(i: int):
+        await config.delay()
+        if config.should_fail():
+            return Response(status_code=503)
+        return Response(preview_wav(i, config.preview_seconds), media_type='audio/wav')
+
+    return app
+
+
+def canned_setlist(num_playlists: int = 2, tracks_per_playlist: int = 12) -> dict:
+    keys = [f"{n}{m}" for n in range(1, 13) for m in 'AB']
+    playlists = []
+    for p in range(num_playlists):
+        tracks = [{
+            'title': f"Fake Track {p * tracks_per_playlist + k}",
+            'artist': f"Fake Artist {(p * tracks_per_playlist + k) % 40}",
+            'bpm': 120 + k,
+            'key': keys[k % len(keys)],
+            'energy': min(10, 3 + k // 2),
+            'position': 'build',
+            'reasoning': 'Canned load-test suggestion',
+        } for k in range(tracks_per_playlist)]
+        playlists.append({
+            'name': f"Load Test Set {p + 1}",
+            'description': 'Canned response from the fake Anthropic server',
+            'bpm_range': '120-132',
+            'energy_progression': 'Gradual build',
+            'recommended_track_count': tracks_per_playlist,
+            'total_duration_estimate': tracks_per_playlist * 4,
+            'genres': ['Techno'],
+            'key_characteristics': ['Synthetic'],
+            'tracks': tracks,
+            'transition_notes': ['Keep it steady'],
+        })
+    return {'playlists': playlists}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def create_anthropic_app(config: FakeConfig) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        await config.delay()
+        if config.should_fail():
+            return JSONResponse(
+                {'type': 'error', 'error': {'type': 'overloaded_error', 'message': 'Injected failure'}},
+                status_code=529,
+            )
+
+        text = json.dumps(canned_setlist())
+        message = {
+            'id': f"msg_{uuid.uuid4().hex[:24]}",
+            'type': 'message',
+            'role': 'assistant',
+            'model': body.get('model', 'fake-model'),
+            'stop_sequence': None,
+            'usage': {'input_tokens': 500, 'output_tokens': len(text) // 4},
+        }
+
+        if not body.get('stream'):
+            return {
+                **message,
+                'content': [{'type': 'text', 'text': text}],
+                'stop_reason': 'end_turn',
+            }
+
+        async def events():
+            yield _sse('message_start', {'type': 'message_start', 'message': {
+                **message, 'content': [], 'stop_reason': None,
+                'usage': {'input_tokens': 500, 'output_tokens': 1},
+            }})
+            yield _sse('content_block_start', {
+                'type': 'content_block_start', 'index': 0,
+                'content_block': {'type': 'text', 'text': ''},
+            })
+            for i in range(0, len(text), config.stream_chunk_chars):
+                await asyncio.sleep(config.latency_ms / 1000 / 20)
+                yield _sse('content_block_delta', {
+                    'type': 'content_block_delta', 'index': 0,
+                    'delta': {'type': 'text_delta', 'text': text[i:i + config.stream_chunk_chars]},
+                })
+            yield _sse('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+            yield _sse('message_delta', {
+                'type': 'message_delta',
+                'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                'usage': {'output_tokens': len(text) // 4},
+            })
+            yield _sse('message_stop', {'type': 'message_stop'})
+
+        return StreamingResponse(events(), media_type='text/event-stream')
+
+    return app
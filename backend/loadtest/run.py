@@ -0,0 +1,294 @@
+"""End-to-end load test for the MixOS API.
+
+Starts fake iTunes and Anthropic servers, points the app at them, runs the
+app in-process under uvicorn and drives a scenario against it over HTTP.
+Reports latency percentiles, throughput and event-loop blocking per endpoint.
+
+    cd backend
+    python -m loadtest.run --scenario mixed --duration 30 --latency-ms 80 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+import wave
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+import uvicorn
+
+from loadtest.fakes import FakeConfig, create_anthropic_app, create_itunes_app
+
+
+LAG_INTERVAL = 0.01  # seconds between event-loop lag probes
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class ServerThread:
+    """Runs an ASGI app under uvicorn on its own thread and event loop."""
+
+    def __init__(self, app, port: int):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = uvicorn.Server(uvicorn.Config(
+            app, host='127.0.0.1', port=port, log_level='warning', lifespan='off',
+        ))
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._server.serve())
+
+    def start(self) -> "ServerThread":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+class LagMonitor:
+    """Samples how late the app's event loop wakes up from short sleeps."""
+
+    def __init__(self):
+        self.samples: List[tuple] = []  # (perf_counter at wake, lag seconds)
+        self._running = True
+
+    async def run(self) -> None:
+        while self._running:
+            expected = time.perf_counter() + LAG_INTERVAL
+            await asyncio.sleep(LAG_INTERVAL)
+            now = time.perf_counter()
+            self.samples.append((now, max(0.0, now - expected)))
+
+    def stop(self) -> None:
+        self._running = False
+
+    def max_lag_between(self, start: float, end: float) -> float:
+        return max((lag for t, lag in self.samples if start <= t <= end + LAG_INTERVAL), default=0.0)
+
+
+@dataclass
+class Result:
+    endpoint: str
+    start: float
+    end: float
+    status: int
+
+    @property
+    def latency(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class Context:
+    client: httpx.AsyncClient
+    itunes_url: str
+    results: List[Result] = field(default_factory=list)
+    deadline: float = 0.0
+
+    async def call(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 0
+        self.results.append(Result(endpoint, start, time.perf_counter(), status))
+        return response
+
+
+def upload_wav(seed: int, seconds: int = 20) -> bytes:
+    """A unique WAV per seed so uploads don't collapse into duplicates."""
+    rng = np.random.default_rng(seed)
+    signal = rng.standard_normal(seconds * 44100) * 0.1
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(44100)
+        wf.writeframes((signal * 32767).astype('<i2').tobytes())
+    return buf.getvalue()
+
+
+# --- Scenario workers. Each loops until the context deadline. ---
+
+async def upload_worker(ctx: Context, worker: int) -> None:
+    n = 0
+    while time.perf_counter() < ctx.deadline:
+        n += 1
+        await ctx.call(
+            'POST /api/tracks/upload', 'POST', '/api/tracks/upload',
+            files={'file': (f"Load Artist - Upload {worker}-{n}.wav", upload_wav(worker * 100000 + n))},
+        )
+
+
+async def search_worker(ctx: Context, worker: int) -> None:
+    while time.perf_counter() < ctx.deadline:
+        await ctx.call(
+            'GET /api/itunes/search', 'GET', '/api/itunes/search',
+            params={'q': f"fake track {random.randint(0, 500)}"},
+        )
+
+
+async def analyze_worker(ctx: Context, worker: int) -> None:
+    while time.perf_counter() < ctx.deadline:
+        i = random.randint(0, 20)
+        track = {
+            'id': str(100000 + i), 'title': f"Fake Track {i}", 'artist': 'Fake Artist',
+            'duration': 30, 'source': 'itunes',
+            'previewUrl': f"{ctx.itunes_url}/previews/{i}.wav",
+        }
+        await ctx.call(
+            'POST /api/itunes/analyze', 'POST', '/api/itunes/analyze',
+            json=track,
+        )
+
+
+async def generate_worker(ctx: Context, worker: int) -> None:
+    while time.perf_counter() < ctx.deadline:
+        await ctx.call(
+            'POST /api/ai/generate-setlist', 'POST', '/api/ai/generate-setlist',
+            json={'query': 'peak time techno', 'num_playlists': 2},
+        )
+
+
+async def library_worker(ctx: Context, worker: int) -> None:
+    while time.perf_counter() < ctx.deadline:
+        await ctx.call('GET /api/tracks/library', 'GET', '/api/tracks/library')
+        await asyncio.sleep(0.5)
+
+
+WORKERS: Dict[str, Callable] = {
+    'upload': upload_worker,
+    'search': search_worker,
+    'analyze': analyze_worker,
+    'generate': generate_worker,
+    'library': library_worker,
+}
+
+# scenario -> {worker kind: concurrency}
+SCENARIOS: Dict[str, Dict[str, int]] = {
+    'upload-burst': {'upload': 16, 'library': 1},
+    'search-storm': {'search': 32},
+    'generate': {'generate': 8},
+    'interactive-under-bulk': {'upload': 16, 'analyze': 2},
+    'mixed': {'upload': 6, 'search': 8, 'analyze': 2, 'generate': 3, 'library': 1},
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    return float(np.percentile(values, pct)) if values else 0.0
+
+
+def report(results: List[Result], monitor: LagMonitor, wall_time: float) -> None:
+    by_endpoint: Dict[str, List[Result]] = defaultdict(list)
+    for r in results:
+        by_endpoint[r.endpoint].append(r)
+
+    header = (f"{'endpoint':<30} {'n':>6} {'err':>5} {'rps':>7} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'lag p95':>8} {'lag max':>8}")
+    print()
+    print(header)
+    print('-' * len(header))
+    for endpoint, rs in sorted(by_endpoint.items()):
+        latencies = [r.latency * 1000 for r in rs]
+        errors = sum(1 for r in rs if not 200 <= r.status < 300)
+        lags = [monitor.max_lag_between(r.start, r.end) * 1000 for r in rs]
+        print(f"{endpoint:<30} {len(rs):>6} {errors:>5} {len(rs) / wall_time:>7.1f} "
+              f"{percentile(latencies, 50):>8.0f} {percentile(latencies, 95):>8.0f} "
+              f"{percentile(latencies, 99):>8.0f} {percentile(lags, 95):>8.0f} {max(lags, default=0):>8.0f}")
+
+    statuses = defaultdict(int)
+    for r in results:
+        statuses[r.status] += 1
+    all_lags = [lag * 1000 for _, lag in monitor.samples]
+    print()
+    print(f"wall time {wall_time:.1f}s, {len(results)} requests, statuses {dict(sorted(statuses.items()))}")
+    print(f"event loop lag: p50 {percentile(all_lags, 50):.1f} ms, p99 {percentile(all_lags, 99):.1f} ms, "
+          f"max {max(all_lags, default=0):.1f} ms, blocked >50ms in {sum(1 for l in all_lags if l > 50)} probes")
+
+
+async def drive(app_url: str, itunes_url: str, mix: Dict[str, int], duration: float) -> tuple:
+    """Run the worker mix until the deadline; returns (results, wall time)."""
+    limits = httpx.Limits(max_connections=sum(mix.values()) + 1)
+    async with httpx.AsyncClient(base_url=app_url, timeout=120, limits=limits) as client:
+        started = time.perf_counter()
+        ctx = Context(client=client, itunes_url=itunes_url, deadline=started + duration)
+        await asyncio.gather(*(
+            WORKERS[kind](ctx, worker)
+            for kind, concurrency in mix.items()
+            for worker in range(concurrency)
+        ))
+        wall_time = time.perf_counter() - started
+        # Leave the library as we found it
+        library = await client.get('/api/tracks/library')
+        for track in library.json():
+            await client.delete(f"/api/tracks/{track['id']}")
+        return ctx.results, wall_time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='mixed')
+    parser.add_argument('--duration', type=float, default=20, help="seconds to drive load")
+    parser.add_argument('--latency-ms', type=float, default=50, help="fake upstream latency")
+    parser.add_argument('--jitter-ms', type=float, default=25)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of upstream calls that fail")
+    args = parser.parse_args()
+
+    config = FakeConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+    itunes_port, anthropic_port, app_port = free_port(), free_port(), free_port()
+    itunes_url = f"http://127.0.0.1:{itunes_port}"
+
+    # Services read these at import time, so set them before importing the app
+    os.environ.update({
+        'ITUNES_SEARCH_URL': f"{itunes_url}/search",
+        'ANTHROPIC_BASE_URL': f"http://127.0.0.1:{anthropic_port}",
+        'ANTHROPIC_API_KEY': 'load-test',
+        'PREVIEW_ALLOWED_HOSTS': '127.0.0.1',
+        'PREVIEW_CACHE_DIR': tempfile.mkdtemp(prefix='mixos-loadtest-'),
+    })
+    from app.main import app
+
+    servers = [
+        ServerThread(create_itunes_app(config, itunes_url), itunes_port).start(),
+        ServerThread(create_anthropic_app(config), anthropic_port).start(),
+    ]
+    app_server = ServerThread(app, app_port).start()
+    servers.append(app_server)
+
+    monitor = LagMonitor()
+    asyncio.run_coroutine_threadsafe(monitor.run(), app_server.loop)
+
+    print(f"scenario {args.scenario}: {SCENARIOS[args.scenario]} for {args.duration:.0f}s, "
+          f"upstream latency {config.latency_ms:.0f}±{config.jitter_ms:.0f} ms, error rate {config.error_rate:.0%}")
+    try:
+        results, wall_time = asyncio.run(drive(app_server.url, itunes_url, SCENARIOS[args.scenario], args.duration))
+    finally:
+        monitor.stop()
+        for server in servers:
+            server.stop()
+    report(results, monitor, wall_time)
+
+
+if __name__ == '__main__':
+    main()
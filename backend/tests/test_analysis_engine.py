@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from app.services.analysis_engine import SAMPLE_RATE, NumpyEngine, fold_bpm
+
+
+def click_track(bpm: float, seconds: int = 30) -> np.ndarray:
+    """Kick on every beat, hi-hat on every offbeat."""
+    rng = np.random.default_rng(int(bpm))
+    n = seconds * SAMPLE_RATE
+    audio = np.zeros(n, dtype=np.float32)
+
+    t = np.arange(int(0.25 * SAMPLE_RATE)) / SAMPLE_RATE
+    kick = np.sin(2 * np.pi * (50 + 100 * np.exp(-t * 30)) * t) * np.exp(-t * 12)
+    t = np.arange(int(0.05 * SAMPLE_RATE)) / SAMPLE_RATE
+    hat = np.diff(rng.standard_normal(len(t) + 1)) * np.exp(-t * 80) * 0.3
+
+    beat = 60 / bpm
+    for start in np.arange(0, seconds, beat):
+        for offset, sound in ((0, kick), (beat / 2, hat)):
+            i = int((start + offset) * SAMPLE_RATE)
+            audio[i:i + len(sound)] += sound[:max(0, n - i)]
+    return audio
+
+
+@pytest.mark.parametrize('bpm', [80, 85, 97, 113, 120, 128, 140, 145, 160, 170, 174, 180])
+def test_numpy_engine_tempo(bpm):
+    assert abs(fold_bpm(NumpyEngine()._detect_bpm(click_track(bpm))) - bpm) <= 1
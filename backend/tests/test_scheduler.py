@@ -0,0 +1,31 @@
+import asyncio
+import threading
+
+from app.services.scheduler import AnalysisScheduler, Priority
+
+
+def test_cancelled_job_keeps_slot_until_thread_finishes():
+    release = threading.Event()
+
+    async def scenario():
+        scheduler = AnalysisScheduler(max_workers=2, bulk_workers=1)
+        job = asyncio.ensure_future(scheduler.run(release.wait, priority=Priority.INTERACTIVE))
+        await asyncio.sleep(0.05)
+        job.cancel()
+        await asyncio.sleep(0.05)
+
+        # The thread can't be interrupted, so its slot must stay taken
+        assert job.cancelled()
+        assert scheduler.stats()['interactive']['running'] == 1
+
+        release.set()
+        for _ in range(100):
+            if scheduler.stats()['interactive']['running'] == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert scheduler.stats()['interactive']['running'] == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
@@ -1,9 +1,9 @@
 import React, { useState, useRef, useEffect, useCallback } from 'react';
-import { Music, Zap, TrendingUp, Clock, Disc, Sparkles, Send, AlertCircle, History, ChevronLeft, ChevronRight, Plus, Check, Play, Pause, Loader2, X } from 'lucide-react';
+import { Music, Zap, TrendingUp, Clock, Disc, Sparkles, Send, AlertCircle, History, ChevronLeft, ChevronRight, Plus, Check, Play, Pause, Loader2, X, Activity } from 'lucide-react';
 import { api } from '../services/api';
 import { useSetlistStore } from '../store/setlistStore';
 import { convertAITrack } from '../utils/convertAITrack';
-import { Track } from '../types';
+import { Track, BatchAnalyzeResult } from '../types';
 
 interface AITrack {
   title: string;
@@ -13,6 +13,8 @@ interface AITrack {
   energy?: number | null;
   position?: string | null;
   reasoning?: string | null;
+  local_match?: Track | null;
+  local_match_score?: number | null;
 }
 
 interface AIPlaylist {
@@ -30,6 +32,7 @@ interface AIPlaylist {
 
 interface PreviewData {
   previewUrl: string;
+  local?: boolean; // previewUrl streams the DJ's own file
   albumArt?: string;
   duration?: number;
 }
@@ -48,6 +51,13 @@ interface AIResultsProps {
 const trackKey = (t: { title: string; artist: string }) =>
   `${t.title.toLowerCase()}|${t.artist.toLowerCase()}`;
 
+// Owned tracks carry measured bpm/key/energy; keep the AI's set context
+const convertOwnedTrack = (t: AITrack): Track => ({
+  ...t.local_match!,
+  position: t.position ?? undefined,
+  reasoning: t.reasoning ?? undefined,
+});
+
 export const AIResults: React.FC<AIResultsProps> = ({ playlists: initialPlaylists, onBack, onShowSetlist }) => {
   const [playlists, setPlaylists] = useState<AIPlaylist[]>(initialPlaylists);
   const [refinement, setRefinement] = useState('');
@@ -68,6 +78,9 @@ export const AIResults: React.FC<AIResultsProps> = ({ playlists: initialPlaylist
   // Audio playback state
   const [playingKey, setPlayingKey] = useState<string | null>(null);
   const [playbackProgress, setPlaybackProgress] = useState(0);
+  // Measured bpm/key/energy from preview analysis, by trackKey
+  const [measured, setMeasured] = useState<Record<string, BatchAnalyzeResult>>({});
+  const [verifyingIdx, setVerifyingIdx] = useState<number | null>(null);
   const audioRef = useRef<HTMLAudioElement | null>(null);
 
   const { currentSetlist, addTrackToSetlist, addTracksToSetlist } = useSetlistStore();
@@ -115,7 +128,23 @@ export const AIResults: React.FC<AIResultsProps> = ({ playlists: initialPlaylist
         return true;
       });
 
-      for (const track of unique) {
+      // Tracks already in the library resolve locally, no iTunes lookup
+      const owned = unique.filter(t => t.local_match);
+      if (owned.length > 0) {
+        setPreviews(prev => {
+          const next = { ...prev };
+          for (const t of owned) {
+            next[trackKey(t)] = {
+              previewUrl: `/api/tracks/${t.local_match!.id}/audio`,
+              local: true,
+              duration: t.local_match!.duration,
+            };
+          }
+          return next;
+        });
+      }
+
+      for (const track of unique.filter(t => !t.local_match)) {
         if (cancelled) break;
         const key = trackKey(track);
 
@@ -174,7 +203,7 @@ export const AIResults: React.FC<AIResultsProps> = ({ playlists: initialPlaylist
       audio.pause();
       setPlayingKey(null);
     } else {
-      audio.src = preview.previewUrl;
+      audio.src = preview.local ? preview.previewUrl : api.previewStreamUrl(preview.previewUrl);
       audio.play();
       setPlayingKey(key);
       setPlaybackProgress(0);
@@ -188,8 +217,41 @@ export const AIResults: React.FC<AIResultsProps> = ({ playlists: initialPlaylist
     );
   };
 
+  // Swap the AI's guesses for measured values once a preview has been analyzed
+  const withMeasurements = (converted: Track, key: string): Track => {
+    const result = measured[key];
+    if (!result || result.error) return converted;
+    return { ...converted, bpm: result.track.bpm, key: result.track.key, energy: result.track.energy };
+  };
+
+  const handleVerify = async (playlist: AIPlaylist, playlistIdx: number) => {
+    const toVerify = playlist.tracks.filter(t => {
+      const key = trackKey(t);
+      return !t.local_match && previews[key]?.previewUrl && !measured[key];
+    });
+    if (toVerify.length === 0) return;
+
+    const keys = toVerify.map(trackKey);
+    const tracks = toVerify.map(t => ({ ...convertAITrack(t), previewUrl: previews[trackKey(t)].previewUrl }));
+    setVerifyingIdx(playlistIdx);
+    setError(null);
+    try {
+      await api.analyzeBatch(tracks, result => {
+        setMeasured(prev => ({ ...prev, [keys[result.index]]: result }));
+      });
+    } catch (err: any) {
+      setError(err.message || 'Failed to verify tracks');
+    } finally {
+      setVerifyingIdx(null);
+    }
+  };
+
   const handleAddTrack = (aiTrack: AITrack) => {
     if (isTrackInSetlist(aiTrack)) return;
+    if (aiTrack.local_match) {
+      addTrackToSetlist(convertOwnedTrack(aiTrack));
+      return;
+    }
     const converted = convertAITrack(aiTrack);
     // Enrich with preview data if available
     const preview = previews[trackKey(aiTrack)];
@@ -198,13 +260,14 @@ export const AIResults: React.FC<AIResultsProps> = ({ playlists: initialPlaylist
       converted.albumArt = preview.albumArt;
       if (preview.duration) converted.duration = preview.duration;
     }
-    addTrackToSetlist(converted);
+    addTrackToSetlist(withMeasurements(converted, trackKey(aiTrack)));
   };
 
   const handleUseTemplate = (playlist: AIPlaylist) => {
     const newTracks = playlist.tracks
       .filter(t => !isTrackInSetlist(t))
       .map(t => {
+        if (t.local_match) return convertOwnedTrack(t);
         const converted = convertAITrack(t);
         const preview = previews[trackKey(t)];
         if (preview) {
@@ -212,7 +275,7 @@ export const AIResults: React.FC<AIResultsProps> = ({ playlists: initialPlaylist
           converted.albumArt = preview.albumArt;
           if (preview.duration) converted.duration = preview.duration;
         }
-        return converted;
+        return withMeasurements(converted, trackKey(t));
       });
     if (newTracks.length > 0) {
       addTracksToSetlist(newTracks);
@@ -460,6 +523,9 @@ export const AIResults: React.FC<AIResultsProps> = ({ playlists: initialPlaylist
                     const preview = previews[key];
                     const isFetching = fetchingPreviews.has(key);
                     const isPlaying = playingKey === key;
+                    // Prefer measured values: owned tracks, then analyzed previews
+                    const verified = measured[key];
+                    const stats = track.local_match ?? (verified && !verified.error ? verified.track : track);
                     return (
                       <div
                         key={trackIdx}
@@ -530,25 +596,38 @@ export const AIResults: React.FC<AIResultsProps> = ({ playlists: initialPlaylist
                                   </span>
                                 )}
                               </div>
-                              <p className="text-gray-500 text-sm ml-8">{track.artist}</p>
+                              <p className="text-gray-500 text-sm ml-8">
+                                {track.artist}
+                                {track.local_match && (
+                                  <span className="ml-2 px-2 py-0.5 rounded-full text-xs border bg-green-500/10 text-green-400 border-green-500/20">
+                                    In library
+                                  </span>
+                                )}
+                              </p>
                             </div>
                           </div>
                           <div className="flex items-center gap-4 text-sm">
-                            {track.bpm != null && (
+                            {stats.bpm != null && (
                               <div className="text-center">
-                                <div className="text-purple-400 font-semibold">{track.bpm}</div>
+                                <div className="text-purple-400 font-semibold">{stats.bpm}</div>
                                 <div className="text-gray-600 text-xs">BPM</div>
+                                {verified?.bpmMatches === false && (
+                                  <div className="text-amber-400 text-xs" title="AI suggested">AI {verified.suggestedBpm}</div>
+                                )}
                               </div>
                             )}
-                            {track.key && (
+                            {stats.key && (
                               <div className="text-center">
-                                <div className="text-red-400 font-semibold">{track.key}</div>
+                                <div className="text-red-400 font-semibold">{stats.key}</div>
                                 <div className="text-gray-600 text-xs">Key</div>
+                                {verified?.keyCompatible === false && (
+                                  <div className="text-amber-400 text-xs" title="AI suggested">AI {verified.suggestedKey}</div>
+                                )}
                               </div>
                             )}
-                            {track.energy != null && (
+                            {stats.energy != null && (
                               <div className="text-center">
-                                <div className="text-blue-400 font-semibold">{track.energy}/10</div>
+                                <div className="text-blue-400 font-semibold">{stats.energy}/10</div>
                                 <div className="text-gray-600 text-xs">Energy</div>
                               </div>
                             )}
@@ -578,10 +657,19 @@ export const AIResults: React.FC<AIResultsProps> = ({ playlists: initialPlaylist
               </div>
 
               {/* Action Button */}
-              <div className="mt-6 pt-6 border-t border-gray-800">
+              <div className="mt-6 pt-6 border-t border-gray-800 flex gap-3">
+                <button
+                  onClick={() => handleVerify(playlist, idx)}
+                  disabled={verifyingIdx !== null}
+                  className="px-5 py-3 bg-gray-800 hover:bg-gray-700 disabled:opacity-50 rounded-lg text-white font-semibold transition-all flex items-center justify-center gap-2"
+                  title="Analyze previews and compare with the AI's BPM/key"
+                >
+                  {verifyingIdx === idx ? <Loader2 className="w-5 h-5 animate-spin" /> : <Activity className="w-5 h-5" />}
+                  Verify BPM &amp; Key
+                </button>
                 <button
                   onClick={() => handleUseTemplate(playlist)}
-                  className="w-full py-3 bg-gradient-to-r from-purple-600 via-red-600 to-blue-600 hover:from-purple-500 hover:via-red-500 hover:to-blue-500 rounded-lg text-white font-semibold transition-all flex items-center justify-center gap-2"
+                  className="flex-1 py-3 bg-gradient-to-r from-purple-600 via-red-600 to-blue-600 hover:from-purple-500 hover:via-red-500 hover:to-blue-500 rounded-lg text-white font-semibold transition-all flex items-center justify-center gap-2"
                 >
                   <Plus className="w-5 h-5" />
                   Use This Setlist Template
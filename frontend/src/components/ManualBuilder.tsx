@@ -4,7 +4,7 @@ import {
   Loader2, AlertCircle, X, FileAudio, Search,
   Play, Pause, Volume2, ArrowLeft, HardDrive, Globe
 } from 'lucide-react';
-import { api } from '../services/api';
+import { api, QueueBusyError } from '../services/api';
 import { Track } from '../types';
 import { useSetlistStore } from '../store/setlistStore';
 import { formatDuration } from '../utils/format';
@@ -79,9 +79,17 @@ export const ManualBuilder: React.FC<ManualBuilderProps> = ({ onBack, onShowSetl
       setUploadProgress(`Analyzing ${file.name} (${i + 1}/${fileArray.length})...`);
 
       try {
-        const track = await api.uploadTrack(file);
+        const track = await api.uploadTrack(
+          file,
+          delay => setUploadProgress(`Analysis queue busy, retrying ${file.name} in ${delay}s...`),
+        );
         setLibrary(prev => [...prev, track]);
       } catch (err: any) {
+        if (err instanceof QueueBusyError) {
+          // Later files would only hit the same full queue
+          setError(`${err.message}. ${fileArray.length - i} file(s) not uploaded.`);
+          break;
+        }
         setError(`Failed to analyze ${file.name}: ${err.message}`);
       }
     }
@@ -133,7 +141,7 @@ export const ManualBuilder: React.FC<ManualBuilderProps> = ({ onBack, onShowSetl
       if (track.source === 'local') {
         audio.src = `/api/tracks/${track.id}/audio`;
       } else if (track.previewUrl) {
-        audio.src = track.previewUrl;
+        audio.src = api.previewStreamUrl(track.previewUrl);
       } else {
         return; // No audio available
       }
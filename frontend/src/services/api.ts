@@ -1,6 +1,36 @@
-import { Track, SearchResult } from '../types';
+import { Track, SearchResult, WaveformPeaks, BatchAnalyzeResult } from '../types';
+import { COLUMNAR_MEDIA_TYPE, columnsToTracks, decodeTrackColumns } from '../utils/columnar';
 
 const API_BASE_URL = '/api';
+const MAX_RETRIES = 2;
+const MAX_RETRY_DELAY_S = 10;
+
+export type AnalysisPriority = 'interactive' | 'bulk';
+
+// The analysis queue is still full after retrying; retryAfter is in seconds
+export class QueueBusyError extends Error {
+  constructor(public retryAfter: number) {
+    super(`Analysis queue is busy, try again in ${retryAfter}s`);
+  }
+}
+
+// Retry requests the analysis scheduler refused a couple of times, waiting
+// for Retry-After (capped) in between, then give up with QueueBusyError
+const fetchWithRetry = async (
+  url: string,
+  init: RequestInit,
+  onRetry?: (delaySeconds: number) => void,
+): Promise<Response> => {
+  for (let attempt = 0; ; attempt++) {
+    const response = await fetch(url, init);
+    if (response.status !== 429) return response;
+    const retryAfter = Number(response.headers.get('Retry-After')) || 1;
+    if (attempt >= MAX_RETRIES) throw new QueueBusyError(retryAfter);
+    const delay = Math.min(retryAfter, MAX_RETRY_DELAY_S);
+    onRetry?.(delay);
+    await new Promise(r => setTimeout(r, delay * 1000));
+  }
+};
 
 export const api = {
   // iTunes/Apple Music search
@@ -11,9 +41,13 @@ export const api = {
     return data.tracks;
   },
 
+  // Playback URL for an iTunes preview, served through the backend cache
+  previewStreamUrl: (previewUrl: string): string =>
+    `${API_BASE_URL}/itunes/preview?url=${encodeURIComponent(previewUrl)}`,
+
   // Analyze track preview for BPM/key/energy
   analyzeTrack: async (track: Track): Promise<Track> => {
-    const response = await fetch(`${API_BASE_URL}/itunes/analyze`, {
+    const response = await fetchWithRetry(`${API_BASE_URL}/itunes/analyze`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify(track),
@@ -22,6 +56,35 @@ export const api = {
     return response.json();
   },
 
+  // Analyze many previews at once; onResult fires per track as each finishes.
+  // Batches run as bulk so they never hold up single-track analysis.
+  analyzeBatch: async (
+    tracks: Track[],
+    onResult: (result: BatchAnalyzeResult) => void,
+    priority: AnalysisPriority = 'bulk',
+  ): Promise<void> => {
+    const response = await fetchWithRetry(`${API_BASE_URL}/itunes/analyze/batch?priority=${priority}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ tracks }),
+    });
+    if (!response.ok || !response.body) throw new Error('Failed to analyze tracks');
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    for (;;) {
+      const { done, value } = await reader.read();
+      buffered += decoder.decode(value, { stream: !done });
+      const lines = buffered.split('\n');
+      buffered = lines.pop() ?? '';
+      for (const line of lines) {
+        if (line.trim()) onResult(JSON.parse(line));
+      }
+      if (done) break;
+    }
+  },
+
   // AI setlist generation
   generateSetlist: async (query: string, numPlaylists: number = 2, targetDuration?: number): Promise<any> => {
     const response = await fetch(`${API_BASE_URL}/ai/generate-setlist`, {
@@ -65,15 +128,19 @@ export const api = {
     return response.json();
   },
 
-  // Upload local audio file for analysis
-  uploadTrack: async (file: File): Promise<Track> => {
+  // Upload local audio file for analysis. Uploads always queue as bulk
+  // work on the backend and back off briefly on 429.
+  uploadTrack: async (
+    file: File,
+    onRetry?: (delaySeconds: number) => void,
+  ): Promise<Track> => {
     const formData = new FormData();
     formData.append('file', file);
 
-    const response = await fetch(`${API_BASE_URL}/tracks/upload`, {
+    const response = await fetchWithRetry(`${API_BASE_URL}/tracks/upload`, {
       method: 'POST',
       body: formData,
-    });
+    }, onRetry);
 
     if (!response.ok) {
       const error = await response.json();
@@ -85,11 +152,28 @@ export const api = {
 
   // List all tracks in the library
   getLibrary: async (): Promise<Track[]> => {
-    const response = await fetch(`${API_BASE_URL}/tracks/library`);
+    const response = await fetch(`${API_BASE_URL}/tracks/library`, {
+      headers: { Accept: `${COLUMNAR_MEDIA_TYPE}, application/json;q=0.5` },
+    });
     if (!response.ok) throw new Error('Failed to load library');
+    if (response.headers.get('Content-Type')?.startsWith(COLUMNAR_MEDIA_TYPE)) {
+      return columnsToTracks(decodeTrackColumns(await response.arrayBuffer()));
+    }
     return response.json();
   },
 
+  // Waveform peaks for a library track (zoom 0 = coarsest)
+  getPeaks: async (trackId: string, zoom: number = 0, bits: 8 | 16 = 16): Promise<WaveformPeaks> => {
+    const response = await fetch(`${API_BASE_URL}/tracks/${trackId}/peaks?zoom=${zoom}&bits=${bits}`);
+    if (!response.ok) throw new Error('Failed to load waveform');
+    const buffer = await response.arrayBuffer();
+    return {
+      samplesPerPeak: Number(response.headers.get('X-Samples-Per-Peak')),
+      sampleRate: Number(response.headers.get('X-Sample-Rate')),
+      peaks: bits === 8 ? new Int8Array(buffer) : new Int16Array(buffer),
+    };
+  },
+
   // Delete a track from the library
   deleteTrack: async (trackId: string): Promise<void> => {
     const response = await fetch(`${API_BASE_URL}/tracks/${trackId}`, {
@@ -28,3 +28,24 @@ export interface SearchResult {
   tracks: Track[];
   total: number;
 }
+
+// Interleaved [min, max] pairs, scaled to the full range of the array type
+export interface WaveformPeaks {
+  samplesPerPeak: number;
+  sampleRate: number;
+  peaks: Int8Array | Int16Array;
+}
+
+// One line of the /itunes/analyze/batch stream; index points into the request
+export interface BatchAnalyzeResult {
+  index: number;
+  track: Track;
+  suggestedBpm?: number;
+  suggestedKey?: string;
+  bpmDelta?: number;
+  bpmMatches?: boolean;
+  keyMatches?: boolean;
+  keyCompatible?: boolean;
+  cached: boolean;
+  error?: string;
+}
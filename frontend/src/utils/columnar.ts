@@ -0,0 +1,120 @@
+import { Track } from '../types';
+
+export const COLUMNAR_MEDIA_TYPE = 'application/vnd.mixos.tracks+columnar';
+
+interface BufferRef {
+  offset: number;
+  length: number;
+}
+
+interface ColumnSpec {
+  name: string;
+  type: 'f32' | 'u32' | 'dict' | 'utf8';
+  data: BufferRef;
+  codes?: 'i16' | 'i32';
+  values?: string[];
+  offsets?: BufferRef;
+  validity?: BufferRef;
+}
+
+export type Column =
+  | { type: 'f32'; values: Float32Array }
+  | { type: 'u32'; values: Uint32Array }
+  | { type: 'dict'; codes: Int16Array | Int32Array; values: string[] }
+  | { type: 'utf8'; get: (row: number) => string | undefined };
+
+export interface TrackColumns {
+  rows: number;
+  columns: Record<string, Column>;
+}
+
+const MAGIC = 'MXC1';
+
+// Zero-copy views over a columnar track payload (see backend/app/services/columnar.py)
+export const decodeTrackColumns = (buffer: ArrayBuffer): TrackColumns => {
+  const view = new DataView(buffer);
+  const magic = new TextDecoder().decode(new Uint8Array(buffer, 0, 4));
+  if (magic !== MAGIC) throw new Error('Not a columnar track payload');
+
+  const headerLength = view.getUint32(4, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+  const bodyStart = Math.ceil((8 + headerLength) / 8) * 8;
+  const rows: number = header.rows;
+
+  const columns: Record<string, Column> = {};
+  for (const spec of header.columns as ColumnSpec[]) {
+    const at = bodyStart + spec.data.offset;
+    switch (spec.type) {
+      case 'f32':
+        columns[spec.name] = { type: 'f32', values: new Float32Array(buffer, at, rows) };
+        break;
+      case 'u32':
+        columns[spec.name] = { type: 'u32', values: new Uint32Array(buffer, at, rows) };
+        break;
+      case 'dict':
+        columns[spec.name] = {
+          type: 'dict',
+          codes: spec.codes === 'i32' ? new Int32Array(buffer, at, rows) : new Int16Array(buffer, at, rows),
+          values: spec.values || [],
+        };
+        break;
+      case 'utf8': {
+        const offsets = new Uint32Array(buffer, bodyStart + spec.offsets!.offset, rows + 1);
+        const bytes = new Uint8Array(buffer, at, spec.data.length);
+        const validity = spec.validity
+          ? new Uint8Array(buffer, bodyStart + spec.validity.offset, spec.validity.length)
+          : null;
+        const decoder = new TextDecoder();
+        columns[spec.name] = {
+          type: 'utf8',
+          get: (row: number) => {
+            if (validity && !(validity[row >> 3] & (1 << (row & 7)))) return undefined;
+            return decoder.decode(bytes.subarray(offsets[row], offsets[row + 1]));
+          },
+        };
+        break;
+      }
+    }
+  }
+  return { rows, columns };
+};
+
+const cell = (column: Column | undefined, row: number): string | number | undefined => {
+  if (!column) return undefined;
+  switch (column.type) {
+    case 'f32': {
+      const v = column.values[row];
+      return Number.isNaN(v) ? undefined : v;
+    }
+    case 'u32':
+      return column.values[row];
+    case 'dict': {
+      const code = column.codes[row];
+      return code < 0 ? undefined : column.values[code];
+    }
+    case 'utf8':
+      return column.get(row);
+  }
+};
+
+// Materialize row objects for components that still want Track[]
+export const columnsToTracks = ({ rows, columns }: TrackColumns): Track[] => {
+  const tracks: Track[] = new Array(rows);
+  for (let i = 0; i < rows; i++) {
+    tracks[i] = {
+      id: cell(columns.id, i) as string,
+      title: cell(columns.title, i) as string,
+      artist: cell(columns.artist, i) as string,
+      album: cell(columns.album, i) as string | undefined,
+      albumArt: cell(columns.albumArt, i) as string | undefined,
+      bpm: cell(columns.bpm, i) as number | undefined,
+      key: cell(columns.key, i) as string | undefined,
+      energy: cell(columns.energy, i) as number | undefined,
+      duration: cell(columns.duration, i) as number,
+      genre: cell(columns.genre, i) as string | undefined,
+      source: cell(columns.source, i) as Track['source'],
+      previewUrl: cell(columns.previewUrl, i) as string | undefined,
+    };
+  }
+  return tracks;
+};